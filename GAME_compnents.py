@@ -1,16 +1,26 @@
 
+import asyncio
+import json
+from typing import Awaitable, Callable, List
+
+
 class Agent:
     def __init__(self,
                  goals: List[Goal],
                  agent_language: AgentLanguage,
                  action_registry: ActionRegistry,
                  generate_response: Callable[[Prompt], str],
-                 environment: Environment):
+                 environment: Environment,
+                 agenerate_response: Callable[[Prompt], Awaitable[str]] = None):
         """
         Initialize an agent with its core GAME components
+
+        agenerate_response is the coroutine used by arun. When it is not given,
+        arun falls back to calling generate_response in a worker thread.
         """
         self.goals = goals
         self.generate_response = generate_response
+        self.agenerate_response = agenerate_response
         self.agent_language = agent_language
         self.actions = action_registry
         self.environment = environment
@@ -25,25 +35,28 @@ class Agent:
         )
 
     def get_action(self, response):
-        invocation = self.agent_language.parse_response(response)
-        action = self.actions.get_action(invocation["tool"])
-        return action, invocation
+        """Return every (action, invocation) pair requested in the response."""
+        invocations = self.agent_language.parse_response(response)
+        if isinstance(invocations, dict):
+            invocations = [invocations]
+        return [(self.actions.get_action(invocation["tool"]), invocation)
+                for invocation in invocations]
 
     def should_terminate(self, response: str) -> bool:
-        action_def, _ = self.get_action(response)
-        return action_def.terminal
+        return any(action_def is not None and action_def.terminal
+                   for action_def, _ in self.get_action(response))
 
     def set_current_task(self, memory: Memory, task: str):
         memory.add_memory({"type": "user", "content": task})
 
-    def update_memory(self, memory: Memory, response: str, result: dict):
+    def update_memory(self, memory: Memory, response: str, results: List[dict]):
         """
-        Update memory with the agent's decision and the environment's response.
+        Update memory with the agent's decision and the environment's response
+        to each action, in call order.
         """
-        new_memories = [
-            {"type": "assistant", "content": response},
-            {"type": "user", "content": json.dumps(result)}
-        ]
+        new_memories = [{"type": "assistant", "content": response}]
+        new_memories += [{"type": "environment", "content": json.dumps(result)}
+                         for result in results]
         for m in new_memories:
             memory.add_memory(m)
 
@@ -64,18 +77,24 @@ class Agent:
 
             print("Agent thinking...")
             # Generate a response from the agent
-            response = self.prompt_llm_for_action(prompt)
+            try:
+                response = self.prompt_llm_for_action(prompt)
+            except Exception as e:
+                # Retries are exhausted; stop here but keep the memory gathered so far
+                print(f"LLM call failed: {e}")
+                break
             print(f"Agent Decision: {response}")
 
-            # Determine which action the agent wants to execute
-            action, invocation = self.get_action(response)
+            # Determine which actions the agent wants to execute
+            calls = [(action, invocation["args"])
+                     for action, invocation in self.get_action(response)]
 
-            # Execute the action in the environment
-            result = self.environment.execute_action(action, invocation["args"])
-            print(f"Action Result: {result}")
+            # Execute the actions in the environment
+            results = self.environment.execute_actions(calls)
+            print(f"Action Results: {results}")
 
             # Update the agent's memory with information about what happened
-            self.update_memory(memory, response, result)
+            self.update_memory(memory, response, results)
 
             # Check if the agent has decided to terminate
             if self.should_terminate(response):
@@ -83,6 +102,50 @@ class Agent:
 
         return memory
 
+    async def aprompt_llm_for_action(self, full_prompt: Prompt) -> str:
+        if self.agenerate_response is None:
+            return await asyncio.to_thread(self.generate_response, full_prompt)
+        response = await self.agenerate_response(full_prompt)
+        return response
+
+    async def arun(self, user_input: str, memory=None, max_iterations: int = 50) -> Memory:
+        """
+        Execute the GAME loop as a coroutine, so a single event loop can keep
+        many agent sessions in flight while their LLM calls are pending.
+        """
+        memory = memory or Memory()
+        self.set_current_task(memory, user_input)
+
+        for _ in range(max_iterations):
+            # Construct a prompt that includes the Goals, Actions, and the current Memory
+            prompt = self.construct_prompt(self.goals, memory, self.actions)
+
+            print("Agent thinking...")
+            # Await the response without blocking other sessions
+            try:
+                response = await self.aprompt_llm_for_action(prompt)
+            except Exception as e:
+                # Retries are exhausted; stop here but keep the memory gathered so far
+                print(f"LLM call failed: {e}")
+                break
+            print(f"Agent Decision: {response}")
+
+            # Determine which actions the agent wants to execute
+            calls = [(action, invocation["args"])
+                     for action, invocation in self.get_action(response)]
+
+            # Execute the actions in the environment
+            results = await self.environment.aexecute_actions(calls)
+            print(f"Action Results: {results}")
+
+            # Update the agent's memory with information about what happened
+            self.update_memory(memory, response, results)
+
+            # Check if the agent has decided to terminate
+            if self.should_terminate(response):
+                break
+
+        return memory
 
 #let’s walk through how the GAME components work together in this agent architecture, explaining each part of agent loop.
 #Step 1: Constructing the Prompt
@@ -131,4 +194,11 @@ def update_memory(self, memory: Memory, response: str, result: dict):
 #Step 6: Termination Check
 def should_terminate(self, response: str) -> bool:
     action_def, _ = self.get_action(response)
-    return action_def.terminal
\ No newline at end of file
+    return action_def.terminal
+
+#Running Many Agents on One Event Loop
+"""Agent.arun is the same loop as Agent.run, but the LLM call and the action are awaited.
+While one agent waits on the model, the event loop is free to drive the others:"""
+
+async def run_many(agents: List[Agent], tasks: List[str]) -> List[Memory]:
+    return await asyncio.gather(*[agent.arun(task) for agent, task in zip(agents, tasks)])
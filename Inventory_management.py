@@ -4,10 +4,17 @@ With LLM-powered agents, we can take a different approach: provide clear goals,
 
 #Rethinking Software Architecture
 
+from inventory_images import shared_describer
+from inventory_search import InventoryVectorIndex, item_text
+from inventory_store import InventoryStore
+
 """Instead of building complex inventory logic,
  we can break down the system into simple tools and let the agent handle the complexity:"""
 
 # Simple tools that focus on data operations
+# inventory_db is an InventoryStore (see inventory_store.py), shared by every session.
+# inventory_index is optional: an InventoryVectorIndex that saved items are added to
+# and that search_inventory needs
 @register_tool(description="Save an item to inventory")
 def save_item(action_context: ActionContext,
               item_name: str,
@@ -16,25 +23,72 @@ def save_item(action_context: ActionContext,
               estimated_value: float) -> dict:
     """Save a single item to the inventory database."""
     inventory = action_context.get("inventory_db")
-    item_id = str(uuid.uuid4())
-    
-    item = {
-        "id": item_id,
-        "name": item_name,
-        "description": description,
-        "condition": condition,
-        "estimated_value": estimated_value,
-        "added_date": datetime.now().isoformat()
-    }
-    
-    inventory[item_id] = item
+    item = InventoryStore.new_item(item_name, description, condition, estimated_value)
+    item_id = inventory.save(item)
+    index = action_context.get("inventory_index")
+    if index is not None:
+        index.add(item_id, item_text(item))
     return {"item_id": item_id}
 
-@register_tool(description="Get all inventory items")
-def get_inventory(action_context: ActionContext) -> List[dict]:
-    """Retrieve all items in the inventory."""
+@register_tool(description="Save several items to inventory at once")
+def save_items(action_context: ActionContext, items: List[dict]) -> dict:
+    """Save many items in one batch. Each item has item_name, description,
+    condition and estimated_value. Nothing is saved if any item is invalid."""
+    inventory = action_context.get("inventory_db")
+    # new_item validates each item, so a bad one fails here instead of in the writer
+    new_items = [
+        InventoryStore.new_item(item.get("item_name"), item.get("description", ""),
+                                item.get("condition", ""), item.get("estimated_value"))
+        for item in items
+    ]
+    item_ids = inventory.save_items(new_items)
+    index = action_context.get("inventory_index")
+    if index is not None:
+        index.add_many([(item["id"], item_text(item)) for item in new_items])
+    return {"item_ids": item_ids}
+
+@register_tool(description="Get inventory items, one page at a time")
+def get_inventory(action_context: ActionContext,
+                  limit: int = 20,
+                  cursor: Optional[str] = None) -> dict:
+    """Retrieve a page of inventory items, newest first. Pass next_cursor from the
+    previous page to get the next one."""
     inventory = action_context.get("inventory_db")
-    return list(inventory.values())
+    return inventory.query(order_by="added_date", descending=True, limit=min(limit, 100), cursor=cursor)
+
+@register_tool(description="Find inventory items by name, condition, value or date added")
+def query_inventory(action_context: ActionContext,
+                    name_prefix: Optional[str] = None,
+                    condition: Optional[str] = None,
+                    min_value: Optional[float] = None,
+                    max_value: Optional[float] = None,
+                    added_after: Optional[str] = None,
+                    added_before: Optional[str] = None,
+                    order_by: str = "added_date",
+                    descending: bool = False,
+                    limit: int = 20,
+                    cursor: Optional[str] = None) -> dict:
+    """Retrieve a page of items matching every given filter. Dates are ISO strings;
+    order_by is added_date, estimated_value or name. Pass next_cursor from the
+    previous page to get the next one."""
+    inventory = action_context.get("inventory_db")
+    return inventory.query(name_prefix, condition, min_value, max_value, added_after,
+                           added_before, order_by, descending, min(limit, 100), cursor)
+
+@register_tool(description="Find inventory items similar to a description")
+def search_inventory(action_context: ActionContext, query: str, top_k: int = 5) -> List[dict]:
+    """Retrieve the items most similar to the query (e.g. "red Jordans"), best match
+    first, each with its similarity score."""
+    inventory = action_context.get("inventory_db")
+    index = action_context.get("inventory_index")
+    if index is None:
+        raise ValueError("search_inventory needs an inventory_index in the action context")
+    results = []
+    for item_id, score in index.search([query], top_k=min(top_k, 50))[0]:
+        item = inventory.get(item_id)
+        if item is not None:
+            results.append({**item, "score": round(score, 3)})
+    return results
 
 @register_tool(description="Get specific inventory item")
 def get_item(action_context: ActionContext, item_id: str) -> dict:
@@ -106,6 +160,10 @@ The shoes have been added to inventory. Would you like to add any additional ite
 
 #Extending with Images (Future Enhancement)
 
+# image_describer is an ImageDescriber (see inventory_images.py): photos are downsized,
+# described several per request, and cached by content hash. Without one in the
+# context, the process-wide shared_describer() is used, so the cache still carries
+# over from call to call
 @register_tool(description="Analyze an image and describe what you see")
 def process_inventory_image(action_context: ActionContext,
                             image_path: str) -> str:
@@ -113,38 +171,18 @@ def process_inventory_image(action_context: ActionContext,
     Look at an image and describe the item, including type, condition, and notable features.
     Returns a natural language description.
     """
-    with open(image_path, "rb") as image_file:
-        image_data = base64.b64encode(image_file.read()).decode("utf-8")
-
-    response = completion(
-        model="gpt-4o",
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": """Please describe this item for inventory purposes.
-                        Include details about:
-                        - What the item is
-                        - Its key features
-                        - The condition it's in
-                        - Any visible wear or damage
-                        - Anything notable about it"""
-                    },
-                    {
-                        "type": "image",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{image_data}"
-                        }
-                    }
-                ]
-            }
-        ],
-        max_tokens=1000
-    )
+    describer = action_context.get("image_describer") or shared_describer()
+    return describer.describe(image_path)
 
-    return response
+@register_tool(description="Describe every item photo in a directory")
+def process_inventory_images(action_context: ActionContext,
+                             directory: str) -> Dict[str, str]:
+    """
+    Describe all photos in a directory at once. Returns a description for each
+    image path; identical photos share a description.
+    """
+    describer = action_context.get("image_describer") or shared_describer()
+    return describer.describe_directory(directory)
 
 """The key is always the same:
 
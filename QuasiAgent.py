@@ -23,8 +23,17 @@ This focused context helps ensure consistent, high-quality output.
 """
 
 from litellm import completion
-from typing import List, Dict
+from typing import List, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
 import sys
+import tempfile
+import time
+
+from llm_rate_limit import rate_limited
+from sandbox import SandboxPool
+
+completion = rate_limited(completion)
 
 def generate_response(messages: List[Dict]) -> str:
    """Call LLM to get response"""
@@ -49,76 +58,280 @@ def extract_code_block(response: str) -> str:
 
    return code_block
 
-def develop_custom_function():
+SYSTEM_PROMPT = {"role": "system", "content": "You are a Python expert helping to develop a function."}
+
+DOCUMENTATION_REQUEST = ("Add comprehensive documentation to this function, including description, parameters, "
+                         "return value, examples, and edge cases. Output the function in a ```python code block```.")
+
+TESTS_REQUEST = ("Add unittest test cases for this function, including tests for basic functionality, "
+                 "edge cases, error cases, and various input scenarios. Output the code in a \`\`\`python code block\`\`\`.")
+
+def code_message(code: str) -> Dict:
+   # Notice that I am purposely causing it to forget its commentary and just see the code so that
+   # it appears that is always outputting just code.
+   return {"role": "assistant", "content": "\`\`\`python\n\n"+code+"\n\n\`\`\`"}
+
+def generate_initial_function(function_description: str) -> Tuple[str, List[Dict]]:
+   """Returns the initial function and the conversation so far, which ends with it as
+   the assistant's reply"""
+   messages = [
+      SYSTEM_PROMPT,
+      {
+         "role": "user",
+         "content": f"Write a Python function that {function_description}. Output the function in a ```python code block```."
+      }
+   ]
+   initial_function = extract_code_block(generate_response(messages))
+   messages.append(code_message(initial_function))
+   return initial_function, messages
+
+def document_function(messages: List[Dict]) -> str:
+   return extract_code_block(generate_response(messages + [{"role": "user", "content": DOCUMENTATION_REQUEST}]))
+
+def generate_tests(messages: List[Dict]) -> str:
+   # We will likely run into random problems here depending on if it outputs JUST the test cases or the
+   # test cases AND the code. This is the type of issue we will learn to work through with agents in the course.
+   return extract_code_block(generate_response(messages + [{"role": "user", "content": TESTS_REQUEST}]))
+
+def filename_for(function_description: str) -> str:
+   filename = function_description.lower()
+   filename = ''.join(c for c in filename if c.isalnum() or c.isspace())
+   return filename.replace(' ', '_')[:30] + '.py'
+
+# os.umask can only be read by setting it, which isn't safe once threads are writing
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+def write_atomically(path: str, content: str):
+   """Write to a temporary file next to path, then rename it over path, so readers
+   never see a half-written file. The file gets the usual umask-based mode; mkstemp
+   alone would leave it readable by the owner only."""
+   directory = os.path.dirname(os.path.abspath(path))
+   fd, temporary = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".py")
+   try:
+      with os.fdopen(fd, "w") as f:
+         f.write(content)
+         f.flush()
+         os.fsync(f.fileno())
+      os.chmod(temporary, 0o666 & ~UMASK)
+      os.replace(temporary, path)
+   except BaseException:
+      os.unlink(temporary)
+      raise
+
+def develop_function(function_description: str, stage_executor: ThreadPoolExecutor = None) -> Tuple[str, str, str]:
+   """Initial function, then documentation and tests. Both later stages only need the
+   initial function, so with a stage_executor they run at the same time.
+   Returns (initial_function, documented_function, test_cases)."""
+   initial_function, messages = generate_initial_function(function_description)
+   if stage_executor is None:
+      return initial_function, document_function(messages), generate_tests(messages)
+   documented = stage_executor.submit(document_function, messages)
+   tests = stage_executor.submit(generate_tests, messages)
+   return initial_function, documented.result(), tests.result()
+
+def print_verification(verified: Dict):
+   for report in verified["candidates"]:
+      runs = ", ".join(f"round {run['round']}: {'passed' if run['passed'] else 'failed'} "
+                       f"({run['tests_run']} tests, {run['seconds']:.2f}s)" for run in report["runs"])
+      print(f"Candidate {report['candidate']}: generated in {report['generate_seconds']:.1f}s; "
+            f"{runs or report.get('error', 'not tested')}")
+
+def develop_custom_function(verify: bool = False, candidates: int = 3, repair_rounds: int = 2):
+   """Returns (function_code, test_cases, filename) in both modes. With verify the code
+   and its tests come back as one block in function_code and test_cases is empty.
+   filename is None when nothing was saved."""
    # Get user input for function description
    print("\nWhat kind of function would you like to create?")
    print("Example: 'A function that calculates the factorial of a number'")
    print("Your description: ", end='')
    function_description = input().strip()
 
-   # Initialize conversation with system prompt
-   messages = [
-      {"role": "system", "content": "You are a Python expert helping to develop a function."}
-   ]
-
-   # First prompt - Basic function
-   messages.append({
-      "role": "user",
-      "content": f"Write a Python function that {function_description}. Output the function in a ```python code block```."
-   })
-   initial_function = generate_response(messages)
+   if verify:
+      # Keep the first candidate whose tests actually pass in the sandbox
+      with SandboxPool(size=candidates) as sandbox:
+         verified = develop_verified_function(function_description, sandbox, candidates, repair_rounds)
+      print("\n=== Verification ===")
+      print_verification(verified)
+      if verified["code"] is None:
+         print("\nNo candidate could be generated")
+         return "", "", None
+      print("\n=== " + ("Verified" if verified["passed"] else "Best Unverified") + " Function and Tests ===")
+      print(verified["code"])
+      filename = filename_for(function_description)
+      write_atomically(filename, verified["code"])
+      return verified["code"], "", filename
 
-   # Parse the response to get the function code
-   initial_function = extract_code_block(initial_function)
+   with ThreadPoolExecutor(max_workers=2) as stage_executor:
+      initial_function, documented_function, test_cases = develop_function(function_description, stage_executor)
 
    print("\n=== Initial Function ===")
    print(initial_function)
-
-   # Add assistant's response to conversation
-   # Notice that I am purposely causing it to forget its commentary and just see the code so that
-   # it appears that is always outputting just code.
-   messages.append({"role": "assistant", "content": "\`\`\`python\n\n"+initial_function+"\n\n\`\`\`"})
-
-   # Second prompt - Add documentation
-   messages.append({
-      "role": "user",
-      "content": "Add comprehensive documentation to this function, including description, parameters, "
-                 "return value, examples, and edge cases. Output the function in a ```python code block```."
-   })
-   documented_function = generate_response(messages)
-   documented_function = extract_code_block(documented_function)
    print("\n=== Documented Function ===")
    print(documented_function)
-
-   # Add documentation response to conversation
-   messages.append({"role": "assistant", "content": "\`\`\`python\n\n"+documented_function+"\n\n\`\`\`"})
-
-   # Third prompt - Add test cases
-   messages.append({
-      "role": "user",
-      "content": "Add unittest test cases for this function, including tests for basic functionality, "
-                 "edge cases, error cases, and various input scenarios. Output the code in a \`\`\`python code block\`\`\`."
-   })
-   test_cases = generate_response(messages)
-   # We will likely run into random problems here depending on if it outputs JUST the test cases or the
-   # test cases AND the code. This is the type of issue we will learn to work through with agents in the course.
-   test_cases = extract_code_block(test_cases)
    print("\n=== Test Cases ===")
    print(test_cases)
 
-   # Generate filename from function description
-   filename = function_description.lower()
-   filename = ''.join(c for c in filename if c.isalnum() or c.isspace())
-   filename = filename.replace(' ', '_')[:30] + '.py'
-
    # Save final version
-   with open(filename, 'w') as f:
-      f.write(documented_function + '\n\n' + test_cases)
+   filename = filename_for(function_description)
+   write_atomically(filename, documented_function + '\n\n' + test_cases)
 
    return documented_function, test_cases, filename
 
-if __name__ == "__main__":
+REPAIR_REQUEST = ("Running the function together with its tests failed:\n\n{output}\n\n"
+                  "Fix the function, or the tests if they are wrong. Output the complete function "
+                  "and its unittest tests together in one ```python code block```.")
+
+def repair_candidate(messages: List[Dict], code: str, test_output: str) -> str:
+   return extract_code_block(generate_response(messages + [
+      code_message(code),
+      {"role": "user", "content": REPAIR_REQUEST.format(output=test_output)}
+   ]))
 
+def develop_verified_function(function_description: str,
+                              sandbox: SandboxPool,
+                              candidates: int = 3,
+                              repair_rounds: int = 2) -> Dict:
+   """Develop several candidates at once and run each one's tests in the sandbox as soon
+   as it is ready. The first candidate whose tests pass wins. If none pass, every failing
+   candidate gets the test output back and one repair attempt per round, for at most
+   repair_rounds rounds. Returns the winning (or best) code and per-candidate timings."""
+   # Candidates and their stages use separate pools so waiting candidates never starve the stages
+   candidate_executor = ThreadPoolExecutor(max_workers=candidates)
+   stage_executor = ThreadPoolExecutor(max_workers=candidates * 2)
+   reports = [{"candidate": i, "generate_seconds": 0.0, "runs": []} for i in range(candidates)]
+   state = {}  # candidate -> (messages, code, last result)
+
+   def generate(i: int):
+      started = time.time()
+      _, messages = generate_initial_function(function_description)
+      documented = stage_executor.submit(document_function, messages)
+      tests = stage_executor.submit(generate_tests, messages)
+      code = documented.result() + '\n\n' + tests.result()
+      reports[i]["generate_seconds"] = time.time() - started
+      return i, messages, code
+
+   def repair(i: int):
+      messages, code, result = state[i]
+      started = time.time()
+      code = repair_candidate(messages, code, result["output"])
+      reports[i]["generate_seconds"] += time.time() - started
+      return i, messages, code
+
+   def verify(futures, round_number: int):
+      """Test candidates as they arrive; returns the first passing candidate or None"""
+      for future in as_completed(futures):
+         try:
+            i, messages, code = future.result()
+         except Exception as e:
+            reports[futures[future]]["error"] = str(e)
+            continue
+         result = sandbox.run(code)
+         reports[i]["runs"].append({"round": round_number, "passed": result["passed"],
+                                    "tests_run": result["tests_run"], "failures": result["failures"],
+                                    "errors": result["errors"], "timed_out": result["timed_out"],
+                                    "seconds": result["seconds"]})
+         state[i] = (messages, code, result)
+         if result["passed"]:
+            return i
+      return None
+
+   try:
+      winner = verify({candidate_executor.submit(generate, i): i for i in range(candidates)}, 0)
+      for round_number in range(1, repair_rounds + 1):
+         if winner is not None or not state:
+            break
+         winner = verify({candidate_executor.submit(repair, i): i for i in state}, round_number)
+   finally:
+      # Candidates still being generated after a winner finish in the background and are ignored
+      candidate_executor.shutdown(wait=False, cancel_futures=True)
+      stage_executor.shutdown(wait=False)
+
+   if winner is None and state:
+      # Nothing passed: keep the candidate with the fewest failing tests, preferring ones whose tests ran
+      winner = min(state, key=lambda i: (state[i][2]["tests_run"] == 0,
+                                         state[i][2]["failures"] + state[i][2]["errors"]))
+   return {
+      "passed": winner is not None and state[winner][2]["passed"],
+      "candidate": winner,
+      "code": state[winner][1] if winner is not None else None,
+      "candidates": reports
+   }
+
+def read_descriptions(path: str) -> List[str]:
+   """One description per line; blank lines and lines starting with # are skipped"""
+   with open(path, "r", encoding="utf-8") as f:
+      return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+def develop_functions_batch(descriptions_path: str, output_dir: str = ".", max_workers: int = 4,
+                            verify: bool = False, candidates: int = 3, repair_rounds: int = 2) -> List[Dict]:
+   """Develop every description in the file concurrently (at most max_workers at a time)
+   and write each result to its own file in output_dir as soon as it is done.
+   With verify, each item is developed with develop_verified_function."""
+   descriptions = read_descriptions(descriptions_path)
+   os.makedirs(output_dir, exist_ok=True)
+
+   # Two descriptions can map to the same file name; number the later ones
+   filenames, used = [], set()
+   for description in descriptions:
+      filename = filename_for(description)
+      stem, number = filename[:-3], 2
+      while filename in used:
+         filename = f"{stem}_{number}.py"
+         number += 1
+      used.add(filename)
+      filenames.append(os.path.join(output_dir, filename))
+
+   def develop(description: str, path: str) -> Dict:
+      started = time.time()
+      try:
+         if verify:
+            verified = develop_verified_function(description, sandbox, candidates, repair_rounds)
+            if verified["code"] is None:
+               raise RuntimeError("no candidate could be generated")
+            write_atomically(path, verified["code"])
+            return {"description": description, "filename": path, "ok": verified["passed"],
+                    "error": None if verified["passed"] else "no candidate passed its tests",
+                    "candidates": verified["candidates"], "seconds": time.time() - started}
+         _, documented_function, test_cases = develop_function(description, stage_executor)
+         write_atomically(path, documented_function + '\n\n' + test_cases)
+         return {"description": description, "filename": path, "ok": True,
+                 "seconds": time.time() - started}
+      except Exception as e:
+         return {"description": description, "filename": path, "ok": False, "error": str(e),
+                 "seconds": time.time() - started}
+
+   results = []
+   sandbox = SandboxPool(size=min(max_workers * candidates, 8)) if verify else None
+   try:
+      # Items and their stages use separate pools so waiting items never starve the stages.
+      # Each item runs its documentation and test stages at the same time, so the stage
+      # pool has two threads per item.
+      with ThreadPoolExecutor(max_workers=2 * max_workers) as stage_executor, \
+            ThreadPoolExecutor(max_workers=max_workers) as item_executor:
+         futures = [item_executor.submit(develop, d, f) for d, f in zip(descriptions, filenames)]
+         for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            status = "saved to " + result["filename"] if result["ok"] else "failed: " + result["error"]
+            print(f"[{len(results)}/{len(futures)}] {result['description'][:50]} ({result['seconds']:.1f}s) {status}")
+   finally:
+      if sandbox is not None:
+         sandbox.close()
+   return results
+
+if __name__ == "__main__":
 
-   function_code, tests, filename = develop_custom_function()
-   print(f"\nFinal code has been saved to {filename}")
\ No newline at end of file
+   # --verify runs the generated tests in a sandbox and repairs failures
+   verify = "--verify" in sys.argv
+   args = [arg for arg in sys.argv[1:] if arg != "--verify"]
+   if args:
+      # Batch mode: python QuasiAgent.py descriptions.txt [output_dir] [max_workers] [--verify]
+      output_dir = args[1] if len(args) > 1 else "."
+      max_workers = int(args[2]) if len(args) > 2 else 4
+      results = develop_functions_batch(args[0], output_dir, max_workers, verify=verify)
+      print(f"\n{sum(r['ok'] for r in results)} of {len(results)} functions developed")
+   else:
+      function_code, tests, filename = develop_custom_function(verify=verify)
+      if filename is not None:
+         print(f"\nFinal code has been saved to {filename}")
@@ -7,11 +7,29 @@ os.environ['OPENAI_API_KEY'] = api_key
 
 
 import json
+import math
+import mmap
 import time
+import asyncio
+import inspect
+import threading
 import traceback
-from litellm import completion
+import weakref
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import Sequence
+from litellm import completion, acompletion
+from file_tools import list_tree, read_file_page
+from project_index import find_in_project
+from process_pool import ActionTimeoutError, WarmProcessPool
+from llm_rate_limit import rate_limited
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from dataclasses import dataclass, field
-from typing import List, Callable, Dict, Any
+from typing import List, Callable, Dict, Any, Awaitable, Tuple, Optional
+
+# Every LLM call goes through the per-model limiter with retries and backoff
+completion = rate_limited(completion)
+acompletion = rate_limited(acompletion)
 
 @dataclass
 class Prompt:
@@ -20,21 +38,39 @@ class Prompt:
     metadata: dict = field(default_factory=dict)  # Fixing mutable default issue
 
 
+def extract_response(response, tools: List[Dict]) -> str:
+    """Turn a completion response into the string the agent language parses.
+
+    A single tool call is returned as one {"tool", "args"} object. When the model
+    asks for several tool calls in one turn, all of them are returned as a list
+    in the order the model produced them.
+    """
+
+    tool_calls = response.choices[0].message.tool_calls
+    if tools and tool_calls:
+        result = [
+            {
+                "tool": tool.function.name,
+                "args": json.loads(tool.function.arguments),
+            } for tool in tool_calls
+        ]
+        return json.dumps(result[0] if len(result) == 1 else result)
+
+    return response.choices[0].message.content
+
+
 def generate_response(prompt: Prompt) -> str:
     """Call LLM to get response"""
 
     messages = prompt.messages
     tools = prompt.tools
 
-    result = None
-
     if not tools:
         response = completion(
             model="openai/gpt-4o",
             messages=messages,
             max_tokens=1024
         )
-        result = response.choices[0].message.content
     else:
         response = completion(
             model="openai/gpt-4o",
@@ -43,18 +79,65 @@ def generate_response(prompt: Prompt) -> str:
             max_tokens=1024
         )
 
-        if response.choices[0].message.tool_calls:
-            tool = response.choices[0].message.tool_calls[0]
-            result = {
-                "tool": tool.function.name,
-                "args": json.loads(tool.function.arguments),
-            }
-            result = json.dumps(result)
-        else:
-            result = response.choices[0].message.content
+    return extract_response(response, tools)
+
+
+def stream_generate_response(prompt: Prompt, make_parser: Callable[[], Any] = None) -> str:
+    """Stream the LLM response and stop as soon as the action is complete.
+
+    make_parser builds a fresh incremental parser for this response; its feed(chunk)
+    returns something truthy once the action can be executed. The rest of the
+    generation is then cancelled, so the agent doesn't wait for trailing tokens.
+    Streaming is only used for text responses; prompts with tools go through
+    generate_response.
+    """
+
+    if prompt.tools:
+        return generate_response(prompt)
+
+    stream = completion(
+        model="openai/gpt-4o",
+        messages=prompt.messages,
+        max_tokens=1024,
+        stream=True
+    )
 
+    parser = make_parser() if make_parser else None
+    chunks = []
+    for chunk in stream:
+        delta = chunk.choices[0].delta.content or ""
+        chunks.append(delta)
+        if parser is not None and parser.feed(delta):
+            # Closing the stream drops the connection, which cancels the generation
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+            break
 
-    return result
+    return "".join(chunks)
+
+
+async def agenerate_response(prompt: Prompt) -> str:
+    """Call LLM to get response without blocking the event loop"""
+
+    messages = prompt.messages
+    tools = prompt.tools
+
+    if not tools:
+        response = await acompletion(
+            model="openai/gpt-4o",
+            messages=messages,
+            max_tokens=1024
+        )
+    else:
+        response = await acompletion(
+            model="openai/gpt-4o",
+            messages=messages,
+            tools=tools,
+            max_tokens=1024
+        )
+
+    return extract_response(response, tools)
 
 
 @dataclass(frozen=True)
@@ -64,23 +147,204 @@ class Goal:
     description: str
 
 
+@dataclass(frozen=True)
+class Cacheable:
+    """Declares when an action's result can be reused.
+
+    pure: the result depends only on the arguments
+    file_args: names of arguments that hold file paths the result depends on
+    directories: directories whose listing the result depends on
+    File and directory dependencies are fingerprinted by mtime and size, so the
+    cached result is dropped as soon as one of them changes.
+    """
+    pure: bool = False
+    file_args: Tuple[str, ...] = ()
+    directories: Tuple[str, ...] = ()
+
+
+class ArgumentError(ValueError):
+    pass
+
+
+_MISSING = object()
+_BOOLEAN_STRINGS = {"true": True, "false": False, "yes": True, "no": False, "1": True, "0": False}
+
+
+def _compile_type_check(schema: dict, path: str) -> Callable[[Any], Any]:
+    """Build a function that coerces a value to schema or raises ArgumentError.
+    Only trivial, lossless fixes are made (e.g. "85.00" -> 85.0, "3" -> 3).
+    Strings with commas ("1,5" is 1.5 in many locales) and non-finite numbers
+    are rejected rather than guessed at."""
+    types = schema.get("type")
+    types = [types] if isinstance(types, str) else list(types or [])
+    nullable = "null" in types
+    types = [t for t in types if t != "null"]
+    enum = schema.get("enum")
+    items = _compile_type_check(schema["items"], f"{path}[]") if "items" in schema else None
+
+    def fail(value, expected):
+        raise ArgumentError(f"{path}: expected {expected}, got {value!r}")
+
+    def coerce_one(value, type_name):
+        if type_name == "string":
+            if isinstance(value, str):
+                return value
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return str(value)
+        elif type_name == "number":
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                if math.isfinite(value):
+                    return value
+            elif isinstance(value, str) and "," not in value:
+                try:
+                    number = float(value.strip())
+                except ValueError:
+                    pass
+                else:
+                    if math.isfinite(number):
+                        return number
+        elif type_name == "integer":
+            if isinstance(value, int) and not isinstance(value, bool):
+                return value
+            if isinstance(value, float) and value.is_integer():
+                return int(value)
+            if isinstance(value, str) and "," not in value:
+                try:
+                    number = float(value.strip())
+                    if number.is_integer():
+                        return int(number)
+                except ValueError:
+                    pass
+        elif type_name == "boolean":
+            if isinstance(value, bool):
+                return value
+            if isinstance(value, str) and value.strip().lower() in _BOOLEAN_STRINGS:
+                return _BOOLEAN_STRINGS[value.strip().lower()]
+        elif type_name == "array":
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+            if isinstance(value, (list, tuple)):
+                return [items(v) for v in value] if items else list(value)
+        elif type_name == "object":
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+            if isinstance(value, dict):
+                return value
+        return _MISSING
+
+    def check(value):
+        if value is None:
+            if nullable or not types:
+                return None
+            fail(value, " or ".join(types))
+        if types:
+            for type_name in types:
+                coerced = coerce_one(value, type_name)
+                if coerced is not _MISSING:
+                    value = coerced
+                    break
+            else:
+                fail(value, " or ".join(types))
+        if enum is not None and value not in enum:
+            fail(value, f"one of {enum}")
+        return value
+
+    return check
+
+
+def compile_validator(schema: Dict) -> Callable[[dict], Tuple[dict, List[str]]]:
+    """Compile a JSON-schema "parameters" object into a function that returns
+    (coerced_args, errors). Schemas without properties accept anything.
+    As in JSON Schema, arguments that aren't listed are allowed unless the schema
+    sets "additionalProperties": false."""
+    properties = (schema or {}).get("properties")
+    if not properties:
+        return lambda args: (args, [])
+
+    checks = {name: _compile_type_check(prop, name) for name, prop in properties.items()}
+    required = list(schema.get("required", []))
+    allow_extra = schema.get("additionalProperties", True) is not False
+
+    def validate(args: dict) -> Tuple[dict, List[str]]:
+        errors = []
+        if not isinstance(args, dict):
+            return args, [f"arguments must be an object, got {args!r}"]
+        coerced = {}
+        for name, value in args.items():
+            check = checks.get(name)
+            if check is None:
+                if allow_extra:
+                    coerced[name] = value
+                else:
+                    errors.append(f"{name}: unexpected argument (expected {', '.join(checks)})")
+                continue
+            try:
+                coerced[name] = check(value)
+            except ArgumentError as e:
+                errors.append(str(e))
+        errors += [f"{name}: required argument missing" for name in required if name not in args]
+        return coerced, errors
+
+    return validate
+
+
 class Action:
     def __init__(self,
                  name: str,
                  function: Callable,
                  description: str,
                  parameters: Dict,
-                 terminal: bool = False):
+                 terminal: bool = False,
+                 timeout: float = None,
+                 executor: str = "inline",
+                 cacheable: Cacheable = None):
+        """
+        cacheable: when set, Environment may reuse earlier results (see Cacheable)
+        timeout: seconds before the call is abandoned and reported as an error
+        executor: "inline" (the agent's thread), "thread" (a worker thread) or
+                  "process" (a warm worker process, recycled if it times out;
+                  the function must be defined at module level in a module the
+                  worker can import without side effects, like file_tools, and its
+                  arguments must be picklable; see process_pool.py). Enforcing a timeout
+                  needs a second thread, so an inline action with a timeout runs
+                  on a worker thread too
+        """
+        if executor not in ("inline", "thread", "process"):
+            raise ValueError(f"Unknown executor: {executor}")
         self.name = name
         self.function = function
         self.description = description
         self.terminal = terminal
         self.parameters = parameters
+        self.timeout = timeout
+        self.executor = executor
+        self.cacheable = cacheable
+        self._validator = None
+
+    def validate_args(self, args: dict) -> Tuple[dict, List[str]]:
+        """Coerce trivially mismatched arguments and report the rest before running.
+        The parameters schema is compiled on first use."""
+        if self._validator is None:
+            self._validator = compile_validator(self.parameters)
+        return self._validator(args)
 
     def execute(self, **args) -> Any:
         """Execute the action's function"""
         return self.function(**args)
 
+    async def aexecute(self, **args) -> Any:
+        """Execute the action's function, awaiting it if it is a coroutine function.
+        Plain functions run in a worker thread so they don't block the event loop."""
+        if inspect.iscoroutinefunction(self.function):
+            return await self.function(**args)
+        return await asyncio.to_thread(self.function, **args)
+
 
 class ActionRegistry:
     def __init__(self):
@@ -105,6 +369,11 @@ class Memory:
         """Add memory to working memory"""
         self.items.append(memory)
 
+    def add_memories(self, memories: List[dict]):
+        """Add the memories from one agent step"""
+        for m in memories:
+            self.add_memory(m)
+
     def get_memories(self, limit: int = None) -> List[Dict]:
         """Get formatted conversation history for prompt"""
         return self.items[:limit]
@@ -117,12 +386,450 @@ class Memory:
         return memory
 
 
+class MemoryItem:
+    """Compact record for one memory. It still answers item["type"] and
+    item.get("content") so code written against dict memories keeps working."""
+    __slots__ = ("type", "content", "timestamp", "tokens")
+
+    def __init__(self, type: str, content: str, timestamp: float = None, tokens: int = None):
+        self.type = type
+        self.content = content
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.tokens = tokens
+
+    @classmethod
+    def from_dict(cls, memory: dict) -> "MemoryItem":
+        content = memory.get("content", None)
+        if not content:
+            # Keep extra fields visible to the LLM, the same way format_memory would
+            content = json.dumps(memory, indent=4)
+        item = cls(memory["type"], content)
+        item.tokens = estimate_tokens(item)
+        return item
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self) -> dict:
+        return {"type": self.type, "content": self.content,
+                "timestamp": self.timestamp, "tokens": self.tokens}
+
+    def __repr__(self):
+        return f"MemoryItem({self.type!r}, {self.content!r})"
+
+
+class MemoryView(Sequence):
+    """Read-only window onto a memory log through an offset index.
+    Creating, slicing and indexing a view are O(1); nothing is copied."""
+
+    def __init__(self, log: List[MemoryItem], offsets: array, start: int = 0, stop: int = None):
+        self._log = log
+        self._offsets = offsets
+        self._start = start
+        self._stop = len(offsets) if stop is None else stop
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return MemoryView(self._log, self._offsets, self._start + start,
+                              self._start + max(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("memory view index out of range")
+        return self._log[self._offsets[self._start + index]]
+
+    def __iter__(self):
+        log, offsets = self._log, self._offsets
+        for i in range(self._start, self._stop):
+            yield log[offsets[i]]
+
+    def __repr__(self):
+        return f"MemoryView({list(self)!r})"
+
+
+class CompactMemory(Memory):
+    """Memory that stores MemoryItem records in an append-only log.
+
+    Alongside the log it keeps offset indexes (compact int arrays) for all items,
+    non-system items and each item type, so filtered views such as "no system",
+    "only environment" or "last N assistant" are O(1) views instead of copies.
+    """
+
+    def __init__(self, log: List[MemoryItem] = None):
+        self._log = [] if log is None else log
+        self._all = array("q")
+        self._non_system = array("q")
+        self._by_type = {}
+
+    @property
+    def items(self) -> MemoryView:
+        return MemoryView(self._log, self._all)
+
+    def add_memory(self, memory):
+        """Add memory to working memory"""
+        item = memory if isinstance(memory, MemoryItem) else MemoryItem.from_dict(memory)
+        offset = len(self._log)
+        self._log.append(item)
+        self._all.append(offset)
+        if item.type != "system":
+            self._non_system.append(offset)
+        self._by_type.setdefault(item.type, array("q")).append(offset)
+
+    def get_memories(self, limit: int = None) -> MemoryView:
+        """Get formatted conversation history for prompt"""
+        return self.items[:limit]
+
+    def get_memories_of_type(self, type: str, last: int = None) -> MemoryView:
+        """View of one type of memory, optionally only the last N of them"""
+        view = MemoryView(self._log, self._by_type.get(type, array("q")))
+        return view[-last:] if last else view
+
+    def without_system_memories(self) -> MemoryView:
+        return MemoryView(self._log, self._non_system)
+
+    def copy_without_system_memories(self):
+        """Return a copy of the memory without system memories.
+        The items themselves are shared; only the offset arrays are copied."""
+        memory = CompactMemory(log=self._log)
+        memory._all = array("q", self._non_system)
+        memory._non_system = array("q", self._non_system)
+        memory._by_type = {t: array("q", offsets)
+                           for t, offsets in self._by_type.items() if t != "system"}
+        return memory
+
+
+def estimate_tokens(item: dict) -> int:
+    """Rough token count (~4 characters per token) that needs no tokenizer"""
+    if isinstance(item, MemoryItem):
+        if item.tokens is not None:
+            return item.tokens
+        return len(item.content) // 4 + 4
+    content = item.get("content", None) or json.dumps(item)
+    return len(content) // 4 + 4
+
+
+def summarize_by_truncation(items: List[Dict]) -> str:
+    """Offline fallback summarizer: keep the start of each folded message"""
+    lines = [f"- {item['type']}: {str(item.get('content', ''))[:200]}" for item in items]
+    return "Summary of earlier steps:\n" + "\n".join(lines)
+
+
+def llm_summarizer(generate_response: Callable[[Prompt], str]) -> Callable[[List[Dict]], str]:
+    """Build a summarize function for TokenBudgetMemory that asks the LLM"""
+    def summarize(items: List[Dict]) -> str:
+        transcript = "\n".join(f"{item['type']}: {item.get('content', '')}" for item in items)
+        return generate_response(Prompt(messages=[
+            {"role": "system", "content": "Summarize these agent steps. Keep file names, "
+                                          "tool results and decisions that later steps may need."},
+            {"role": "user", "content": transcript}
+        ]))
+    return summarize
+
+
+# Default for every TokenBudgetMemory without its own executor, so sessions don't each
+# keep a thread alive. Many concurrent sessions should pass a larger pool instead.
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summarize")
+
+
+class TokenBudgetMemory(Memory):
+    """Memory whose prompt view stays under a token budget.
+
+    The full history is still kept in items. get_memories returns the user task,
+    summaries of older steps and a sliding window of recent turns. When the view
+    goes over max_tokens, the oldest assistant/environment turns leave the window
+    and are summarized on a background thread; a placeholder stands in until the
+    summary is ready, so add_memory never waits on the summarizer. If the
+    summaries themselves fill the budget, they are merged into one summary
+    rather than dropped.
+    """
+
+    def __init__(self,
+                 max_tokens: int = 8000,
+                 keep_recent: int = 6,
+                 summarize: Callable[[List[Dict]], str] = None,
+                 count_tokens: Callable[[dict], int] = None,
+                 compact_to: float = 0.75,
+                 executor: ThreadPoolExecutor = None):
+        """
+        executor: runs the summaries. Defaults to a small pool shared by every
+                  TokenBudgetMemory; sessions on an AgentPool should use its
+                  summary_executor, which is sized for the pool's concurrency
+        """
+        super().__init__()
+        self.executor = executor or _summary_executor
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.summarize = summarize or summarize_by_truncation
+        self.count_tokens = count_tokens or estimate_tokens
+        self.compact_to = compact_to
+        self.pinned = None            # (item, tokens) for the user task
+        self.summaries = deque()      # [item, tokens, pending future or None]
+        self.window = deque()         # (item, tokens)
+        self.view_tokens = 0
+
+    def add_memory(self, memory: dict):
+        """Add memory and fold old turns if the view is over budget"""
+        super().add_memory(memory)
+        tokens = self.count_tokens(memory)
+        self.view_tokens += tokens
+        if self.pinned is None and memory["type"] == "user":
+            self.pinned = (memory, tokens)
+            return
+        self.window.append((memory, tokens))
+        if self.view_tokens > self.max_tokens:
+            self._compact()
+
+    def get_memories(self, limit: int = None) -> List[Dict]:
+        """Get the budgeted view: task, summaries, then the recent window"""
+        self._collect_summaries()
+        view = [self.pinned[0]] if self.pinned else []
+        view += [entry[0] for entry in self.summaries]
+        view += [item for item, _ in self.window]
+        return view[:limit]
+
+    def wait_for_summaries(self):
+        """Block until every pending summary has been folded in"""
+        # Folding a summary in can start a merge, so wait until nothing is pending
+        while any(entry[2] is not None for entry in self.summaries):
+            for entry in list(self.summaries):
+                if entry[2] is not None:
+                    entry[2].result()
+            self._collect_summaries()
+
+    def _compact(self):
+        """Fold the oldest turns out of the window until the view is back under
+        compact_to * max_tokens (or only keep_recent items are left)."""
+        target = self.max_tokens * self.compact_to
+        folded = []
+        while self.view_tokens > target:
+            # Fold a whole turn: the item plus the environment results that follow it
+            turn = 1
+            while turn < len(self.window) and self.window[turn][0]["type"] == "environment":
+                turn += 1
+            if len(self.window) - turn < self.keep_recent:
+                break
+            for _ in range(turn):
+                item, tokens = self.window.popleft()
+                folded.append(item)
+                self.view_tokens -= tokens
+
+        if folded:
+            placeholder = {"type": "summary",
+                           "content": f"[{len(folded)} earlier messages are being summarized]"}
+            tokens = self.count_tokens(placeholder)
+            future = self.executor.submit(self._summarize, folded)
+            self.summaries.append([placeholder, tokens, future])
+            self.view_tokens += tokens
+
+        # Summaries are never dropped; when they fill the budget they become one summary
+        if self.view_tokens > self.max_tokens and len(self.summaries) > 1:
+            merged = list(self.summaries)
+            self.summaries.clear()
+            self.view_tokens -= sum(entry[1] for entry in merged)
+            placeholder = {"type": "summary",
+                           "content": f"[{len(merged)} earlier summaries are being merged]"}
+            tokens = self.count_tokens(placeholder)
+            future = self.executor.submit(self._merge_summaries, merged)
+            self.summaries.append([placeholder, tokens, future])
+            self.view_tokens += tokens
+
+    def _merge_summaries(self, entries: List[list]) -> str:
+        # Pending summaries were submitted earlier, so they are already running or done
+        items = [entry[0] if entry[2] is None else {"type": "summary", "content": entry[2].result()}
+                 for entry in entries]
+        return self._summarize(items)
+
+    def _summarize(self, items: List[Dict]) -> str:
+        try:
+            return self.summarize(items)
+        except Exception:
+            return summarize_by_truncation(items)
+
+    def _collect_summaries(self):
+        """Swap in summaries whose background job has finished"""
+        changed = False
+        for entry in self.summaries:
+            future = entry[2]
+            if future is None or not future.done():
+                continue
+            item = {"type": "summary", "content": future.result()}
+            tokens = self.count_tokens(item)
+            self.view_tokens += tokens - entry[1]
+            entry[0], entry[1], entry[2] = item, tokens, None
+            changed = True
+        if changed and self.view_tokens > self.max_tokens:
+            self._compact()
+
+
+class PersistentMemory(Memory):
+    """Durable Memory backed by an append-only JSONL log.
+
+    Each agent step (add_memories) is written as one append, so after a crash the
+    log ends at the last completed step; a torn final line is cut off on open.
+    A sidecar .idx file holds the end offset of every line, so opening a long
+    session only reads that index and memory-maps the log. Items are decoded
+    from the map the first time they are accessed.
+
+    Passing an existing log to Agent.run(memory=...) resumes an unfinished session
+    where it stopped; a finished one is continued with the new user input.
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._ends = array("q")   # end offset of each line in the log
+        self._decoded = []        # decoded items, None until first accessed
+        self._map = None
+        self._open()
+        self.resumed = len(self._ends) > 0
+
+    def _open(self):
+        with open(self.path, "ab"):
+            pass
+        size = os.path.getsize(self.path)
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+            self._ends.frombytes(data[:len(data) - len(data) % self._ends.itemsize])
+            # The index is written after the log, so it can only be behind it
+            while self._ends and self._ends[-1] > size:
+                self._ends.pop()
+
+        committed = self._ends[-1] if self._ends else 0
+        if size > 0:
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # Index lines written after the last index update
+            pos = self._map.find(b"\n", committed)
+            while pos >= 0:
+                committed = pos + 1
+                self._ends.append(committed)
+                pos = self._map.find(b"\n", committed)
+
+        if committed < size:
+            # A partial line from a step that never finished writing
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            with open(self.path, "r+b") as f:
+                f.truncate(committed)
+            if committed:
+                with open(self.path, "rb") as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        with open(self.index_path, "wb") as f:
+            self._ends.tofile(f)
+        self._decoded = [None] * len(self._ends)
+
+    @property
+    def items(self) -> List[Dict]:
+        return [self._item(i) for i in range(len(self._ends))]
+
+    def _item(self, i: int) -> dict:
+        item = self._decoded[i]
+        if item is None:
+            start = self._ends[i - 1] if i else 0
+            item = json.loads(self._map[start:self._ends[i]])
+            self._decoded[i] = item
+        return item
+
+    def add_memory(self, memory: dict):
+        """Add memory to working memory"""
+        self.add_memories([memory])
+
+    def add_memories(self, memories: List[dict]):
+        """Append one step's memories to the log in a single write"""
+        lines = [json.dumps(m, separators=(",", ":")).encode("utf-8") + b"\n" for m in memories]
+        with self._lock:
+            offset = self._ends[-1] if self._ends else 0
+            with open(self.path, "ab") as f:
+                f.write(b"".join(lines))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            new_ends = array("q")
+            for line in lines:
+                offset += len(line)
+                new_ends.append(offset)
+            with open(self.index_path, "ab") as f:
+                new_ends.tofile(f)
+            self._ends.extend(new_ends)
+            self._decoded.extend(memories)
+
+    def get_memories(self, limit: int = None) -> List[Dict]:
+        """Get formatted conversation history for prompt"""
+        count = len(self._ends) if limit is None else min(limit, len(self._ends))
+        return [self._item(i) for i in range(count)]
+
+    def __len__(self):
+        return len(self._ends)
+
+    def __bool__(self):
+        return True
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def _fingerprint(path: str, directory: bool = False) -> tuple:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (path, None)
+    if directory:
+        return (path, stat.st_mtime_ns)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
 class Environment:
+    def __init__(self, max_workers: int = 8, process_workers: int = 2,
+                 max_cached_results: int = 256):
+        self.max_workers = max_workers
+        self.process_workers = process_workers
+        self.max_cached_results = max_cached_results
+        self._executor = None
+        self._action_executor = None
+        self._process_pool = None
+        self._lock = threading.Lock()
+        self._result_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.abandoned_calls = 0
+
     def execute_action(self, action: Action, args: dict) -> dict:
         """Execute an action and return the result."""
+        if action is None:
+            return self.format_unknown_tool()
         try:
-            result = action.execute(**args)
+            args, errors = action.validate_args(args)
+            if errors:
+                return self.format_invalid_args(action, errors)
+            key = self.result_cache_key(action, args)
+            if key is not None:
+                hit, result = self.cached_result(key)
+                if hit:
+                    return self.format_result(result, cached=True)
+            result = self.run_action(action, args)
+            self.store_result(key, result)
             return self.format_result(result)
+        except ActionTimeoutError as e:
+            return self.format_timeout(action, e)
         except Exception as e:
             return {
                 "tool_executed": False,
@@ -130,13 +837,173 @@ class Environment:
                 "traceback": traceback.format_exc()
             }
 
-    def format_result(self, result: Any) -> dict:
-        """Format the result with metadata."""
+    async def aexecute_action(self, action: Action, args: dict) -> dict:
+        """Execute an action from inside an event loop and return the result."""
+        if action is None:
+            return self.format_unknown_tool()
+        try:
+            args, errors = action.validate_args(args)
+            if errors:
+                return self.format_invalid_args(action, errors)
+            key = self.result_cache_key(action, args)
+            if key is not None:
+                hit, result = self.cached_result(key)
+                if hit:
+                    return self.format_result(result, cached=True)
+            if action.executor == "inline":
+                result = await asyncio.wait_for(action.aexecute(**args), action.timeout)
+            else:
+                result = await asyncio.to_thread(self.run_action, action, args)
+            self.store_result(key, result)
+            return self.format_result(result)
+        except (ActionTimeoutError, asyncio.TimeoutError) as e:
+            return self.format_timeout(action, e)
+        except Exception as e:
+            return {
+                "tool_executed": False,
+                "error": str(e),
+                "traceback": traceback.format_exc()
+            }
+
+    def run_action(self, action: Action, args: dict) -> Any:
+        """Run the action on its executor, enforcing its timeout"""
+        if action.executor == "process":
+            return self.process_pool().call(action.function, args, action.timeout)
+
+        if action.executor == "thread" or action.timeout is not None:
+            # A thread can't be killed; on timeout the call is abandoned and left to finish
+            executor = self.action_executor()
+            future = executor.submit(action.execute, **args)
+            try:
+                return future.result(timeout=action.timeout)
+            except FutureTimeoutError:
+                self.retire_action_executor(executor)
+                raise ActionTimeoutError(f"timed out after {action.timeout}s")
+
+        return action.execute(**args)
+
+    def call_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def action_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._action_executor is None:
+                self._action_executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._action_executor
+
+    def retire_action_executor(self, executor: ThreadPoolExecutor):
+        """The abandoned call keeps its worker busy, so later calls get a fresh pool;
+        the old one finishes what it has and its threads exit"""
+        with self._lock:
+            self.abandoned_calls += 1
+            if self._action_executor is executor:
+                self._action_executor = None
+        executor.shutdown(wait=False)
+
+    def process_pool(self) -> WarmProcessPool:
+        with self._lock:
+            if self._process_pool is None:
+                self._process_pool = WarmProcessPool(self.process_workers)
+            return self._process_pool
+
+    def result_cache_key(self, action: Action, args: dict) -> Optional[tuple]:
+        """Key on the arguments plus fingerprints of every file the result depends on"""
+        policy = action.cacheable
+        if policy is None or self.max_cached_results <= 0:
+            return None
+        fingerprints = tuple(_fingerprint(str(args[name])) for name in policy.file_args
+                             if name in args)
+        fingerprints += tuple(_fingerprint(path, directory=True) for path in policy.directories)
+        return (action.name, json.dumps(args, sort_keys=True, default=str), fingerprints)
+
+    def cached_result(self, key: tuple) -> Tuple[bool, Any]:
+        with self._cache_lock:
+            if key in self._result_cache:
+                self._result_cache.move_to_end(key)
+                return True, self._result_cache[key]
+        return False, None
+
+    def store_result(self, key: Optional[tuple], result: Any):
+        if key is None:
+            return
+        with self._cache_lock:
+            self._result_cache[key] = result
+            self._result_cache.move_to_end(key)
+            while len(self._result_cache) > self.max_cached_results:
+                self._result_cache.popitem(last=False)
+
+    def format_invalid_args(self, action: Action, errors: List[str]) -> dict:
         return {
+            "tool_executed": False,
+            "error": f"Invalid arguments for {action.name}: " + "; ".join(errors),
+            "validation_errors": errors
+        }
+
+    def format_unknown_tool(self) -> dict:
+        # The registry returns None for a tool name it doesn't know
+        return {
+            "tool_executed": False,
+            "error": "Unknown tool: no registered action has the requested name"
+        }
+
+    def format_timeout(self, action: Action, error: Exception) -> dict:
+        message = str(error) or f"timed out after {action.timeout}s"
+        return {
+            "tool_executed": False,
+            "error": f"{action.name} {message}",
+            "timed_out": True,
+            "timeout": action.timeout
+        }
+
+    def execute_actions(self, calls: List[Tuple[Action, dict]]) -> List[dict]:
+        """Execute independent actions in parallel on a bounded thread pool.
+        Results are returned in the same order as the calls."""
+        if len(calls) == 1:
+            action, args = calls[0]
+            return [self.execute_action(action, args)]
+
+        futures = [self.call_executor().submit(self.execute_action, action, args)
+                   for action, args in calls]
+        return [f.result() for f in futures]
+
+    async def aexecute_actions(self, calls: List[Tuple[Action, dict]]) -> List[dict]:
+        """Execute independent actions concurrently from inside an event loop."""
+        return list(await asyncio.gather(
+            *[self.aexecute_action(action, args) for action, args in calls]
+        ))
+
+    def close(self):
+        """Shut down the worker threads and processes. Calls still running on a
+        worker thread are left to finish; worker processes are stopped."""
+        with self._lock:
+            executors = [self._executor, self._action_executor]
+            process_pool = self._process_pool
+            self._executor = self._action_executor = self._process_pool = None
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        if process_pool is not None:
+            process_pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def format_result(self, result: Any, cached: bool = False) -> dict:
+        """Format the result with metadata."""
+        formatted = {
             "tool_executed": True,
             "result": result,
             "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")
         }
+        if cached:
+            formatted["cached"] = True
+        return formatted
 
 
 class AgentLanguage:
@@ -160,6 +1027,11 @@ class AgentFunctionCallingActionLanguage(AgentLanguage):
 
     def __init__(self):
         super().__init__()
+        # construct_prompt reuses formatted goals/tools until their inputs change,
+        # and only formats Memory items appended since the previous call
+        self._goals_cache = (None, None)
+        self._tools_cache = (None, None)
+        self._memory_cache = weakref.WeakKeyDictionary()
 
     def format_goals(self, goals: List[Goal]) -> List:
         # Map all goals to a single string that concatenates their description
@@ -176,21 +1048,19 @@ class AgentFunctionCallingActionLanguage(AgentLanguage):
         # Map all assistant messages to a role:assistant messages
         # Map all user messages to a role:user messages
         items = memory.get_memories()
-        mapped_items = []
-        for item in items:
+        return [self.format_memory_item(item) for item in items]
 
-            content = item.get("content", None)
-            if not content:
-                content = json.dumps(item, indent=4)
+    def format_memory_item(self, item: dict) -> dict:
+        content = item.get("content", None)
+        if not content:
+            content = json.dumps(item.to_dict() if isinstance(item, MemoryItem) else item, indent=4)
 
-            if item["type"] == "assistant":
-                mapped_items.append({"role": "assistant", "content": content})
-            elif item["type"] == "environment":
-                mapped_items.append({"role": "assistant", "content": content})
-            else:
-                mapped_items.append({"role": "user", "content": content})
-
-        return mapped_items
+        if item["type"] == "assistant":
+            return {"role": "assistant", "content": content}
+        elif item["type"] == "environment":
+            return {"role": "assistant", "content": content}
+        else:
+            return {"role": "user", "content": content}
 
     def format_actions(self, actions: List[Action]) -> [List,List]:
         """Generate response from language model"""
@@ -216,12 +1086,55 @@ class AgentFunctionCallingActionLanguage(AgentLanguage):
                          memory: Memory) -> Prompt:
 
         prompt = []
-        prompt += self.format_goals(goals)
-        prompt += self.format_memory(memory)
+        prompt += self.cached_format_goals(goals)
+        prompt += self.incremental_format_memory(memory)
+
+        tools = self.cached_format_actions(actions)
+
+        return Prompt(messages=prompt, tools=list(tools))
+
+    def cached_format_goals(self, goals: List[Goal]) -> List:
+        """Goals are frozen, so the tuple of goals is a safe cache key"""
+        key = tuple(goals)
+        cached_key, formatted = self._goals_cache
+        if cached_key != key:
+            formatted = self.format_goals(goals)
+            self._goals_cache = (key, formatted)
+        return formatted
+
+    def cached_format_actions(self, actions: List[Action]) -> List:
+        """Re-format the tools whenever the registry hands us a different set of actions"""
+        key = tuple(actions)
+        cached_key, formatted = self._tools_cache
+        if cached_key != key:
+            formatted = self.format_actions(actions)
+            self._tools_cache = (key, formatted)
+        return formatted
+
+    def incremental_format_memory(self, memory: Memory) -> List:
+        """Format only the memories that changed since the last call for this Memory.
+
+        Every cached item is compared by identity, and formatting is reused only up
+        to the first item that differs. Items replaced anywhere in the list (e.g. a
+        summary swapped in for its placeholder) are formatted again, along with
+        everything after them.
+        """
+        items = memory.get_memories()
+        sources, formatted = self._memory_cache.get(memory, ([], []))
 
-        tools = self.format_actions(actions)
+        n = 0
+        shared = min(len(sources), len(items))
+        while n < shared and items[n] is sources[n]:
+            n += 1
+        del sources[n:]
+        del formatted[n:]
 
-        return Prompt(messages=prompt, tools=tools)
+        for item in items[n:]:
+            sources.append(item)
+            formatted.append(self.format_memory_item(item))
+
+        self._memory_cache[memory] = (sources, formatted)
+        return formatted
 
     def adapt_prompt_after_parsing_error(self,
                                          prompt: Prompt,
@@ -251,12 +1164,17 @@ class Agent:
                  agent_language: AgentLanguage,
                  action_registry: ActionRegistry,
                  generate_response: Callable[[Prompt], str],
-                 environment: Environment):
+                 environment: Environment,
+                 agenerate_response: Callable[[Prompt], Awaitable[str]] = None):
         """
         Initialize an agent with its core GAME components
+
+        agenerate_response is the coroutine used by arun. When it is not given,
+        arun falls back to calling generate_response in a worker thread.
         """
         self.goals = goals
         self.generate_response = generate_response
+        self.agenerate_response = agenerate_response
         self.agent_language = agent_language
         self.actions = action_registry
         self.environment = environment
@@ -271,27 +1189,48 @@ class Agent:
         )
 
     def get_action(self, response):
-        invocation = self.agent_language.parse_response(response)
-        action = self.actions.get_action(invocation["tool"])
-        return action, invocation
+        """Return every (action, invocation) pair requested in the response."""
+        invocations = self.agent_language.parse_response(response)
+        if isinstance(invocations, dict):
+            invocations = [invocations]
+        return [(self.actions.get_action(invocation["tool"]), invocation)
+                for invocation in invocations]
 
     def should_terminate(self, response: str) -> bool:
-        action_def, _ = self.get_action(response)
-        return action_def.terminal
+        return any(action_def is not None and action_def.terminal
+                   for action_def, _ in self.get_action(response))
 
     def set_current_task(self, memory: Memory, task: str):
         memory.add_memory({"type": "user", "content": task})
 
-    def update_memory(self, memory: Memory, response: str, result: dict):
+    def update_memory(self, memory: Memory, response: str, results: List[dict]):
         """
-        Update memory with the agent's decision and the environment's response.
+        Update memory with the agent's decision and the environment's response
+        to each action, in call order.
         """
-        new_memories = [
-            {"type": "assistant", "content": response},
-            {"type": "environment", "content": json.dumps(result)}
-        ]
-        for m in new_memories:
-            memory.add_memory(m)
+        new_memories = [{"type": "assistant", "content": response}]
+        new_memories += [{"type": "environment", "content": json.dumps(result)}
+                         for result in results]
+        memory.add_memories(new_memories)
+
+    def start_session(self, memory: Memory, task: str):
+        """Set the task, or pick up a resumed memory where it left off.
+        A saved session that had already terminated is continued with the new task."""
+        if not getattr(memory, "resumed", False):
+            self.set_current_task(memory, task)
+            return
+
+        memory.resumed = False
+        assistant = [m for m in memory.get_memories() if m["type"] == "assistant"]
+        try:
+            finished = bool(assistant) and self.should_terminate(assistant[-1]["content"])
+        except Exception:
+            finished = False
+        if finished:
+            print("Saved session already finished; continuing it with the new task...")
+            self.set_current_task(memory, task)
+        else:
+            print("Resuming from saved memory...")
 
     def prompt_llm_for_action(self, full_prompt: Prompt) -> str:
         response = self.generate_response(full_prompt)
@@ -302,7 +1241,7 @@ class Agent:
         Execute the GAME loop for this agent with a maximum iteration limit.
         """
         memory = memory or Memory()
-        self.set_current_task(memory, user_input)
+        self.start_session(memory, user_input)
 
         for _ in range(max_iterations):
             # Construct a prompt that includes the Goals, Actions, and the current Memory
@@ -310,18 +1249,69 @@ class Agent:
 
             print("Agent thinking...")
             # Generate a response from the agent
-            response = self.prompt_llm_for_action(prompt)
+            try:
+                response = self.prompt_llm_for_action(prompt)
+            except Exception as e:
+                # Retries are exhausted; stop here but keep the memory gathered so far
+                print(f"LLM call failed: {e}")
+                break
+            print(f"Agent Decision: {response}")
+
+            # Determine which actions the agent wants to execute
+            calls = [(action, invocation["args"])
+                     for action, invocation in self.get_action(response)]
+
+            # Execute the actions in the environment
+            results = self.environment.execute_actions(calls)
+            print(f"Action Results: {results}")
+
+            # Update the agent's memory with information about what happened
+            self.update_memory(memory, response, results)
+
+            # Check if the agent has decided to terminate
+            if self.should_terminate(response):
+                break
+
+        return memory
+
+    async def aprompt_llm_for_action(self, full_prompt: Prompt) -> str:
+        if self.agenerate_response is None:
+            return await asyncio.to_thread(self.generate_response, full_prompt)
+        response = await self.agenerate_response(full_prompt)
+        return response
+
+    async def arun(self, user_input: str, memory=None, max_iterations: int = 50) -> Memory:
+        """
+        Execute the GAME loop as a coroutine, so a single event loop can keep
+        many agent sessions in flight while their LLM calls are pending.
+        """
+        memory = memory or Memory()
+        self.start_session(memory, user_input)
+
+        for _ in range(max_iterations):
+            # Construct a prompt that includes the Goals, Actions, and the current Memory
+            prompt = self.construct_prompt(self.goals, memory, self.actions)
+
+            print("Agent thinking...")
+            # Await the response without blocking other sessions
+            try:
+                response = await self.aprompt_llm_for_action(prompt)
+            except Exception as e:
+                # Retries are exhausted; stop here but keep the memory gathered so far
+                print(f"LLM call failed: {e}")
+                break
             print(f"Agent Decision: {response}")
 
-            # Determine which action the agent wants to execute
-            action, invocation = self.get_action(response)
+            # Determine which actions the agent wants to execute
+            calls = [(action, invocation["args"])
+                     for action, invocation in self.get_action(response)]
 
-            # Execute the action in the environment
-            result = self.environment.execute_action(action, invocation["args"])
-            print(f"Action Result: {result}")
+            # Execute the actions in the environment
+            results = await self.environment.aexecute_actions(calls)
+            print(f"Action Results: {results}")
 
             # Update the agent's memory with information about what happened
-            self.update_memory(memory, response, result)
+            self.update_memory(memory, response, results)
 
             # Check if the agent has decided to terminate
             if self.should_terminate(response):
@@ -340,12 +1330,13 @@ class Agent:
     # Define the agent's language
     agent_language = AgentFunctionCallingActionLanguage()
 
-    def read_project_file(name: str) -> str:
-        with open(name, "r") as f:
-            return f.read()
+    def read_project_file(name: str, offset: int = 0, limit: int = 200, unit: str = "lines") -> str:
+        # One page at a time, so a huge file can't flood memory or the context window
+        return read_file_page(name, offset, limit, unit)
 
     def list_project_files() -> List[str]:
-        return sorted([file for file in os.listdir(".") if file.endswith(".py")])
+        # Served from the cached directory snapshot unless the directory changed
+        return [entry["path"] for entry in list_tree(".", max_depth=1, pattern="*.py", limit=None)["entries"]]
 
 
     # Define the action registry and register some actions
@@ -355,19 +1346,41 @@ class Agent:
         function=list_project_files,
         description="Lists all files in the project.",
         parameters={},
-        terminal=False
+        terminal=False,
+        cacheable=Cacheable(directories=(".",))
     ))
     action_registry.register(Action(
         name="read_project_file",
         function=read_project_file,
-        description="Reads a file from the project.",
+        description="Reads a page of a file from the project. The first line gives the file's "
+                    "size and line count and the offset of the next page.",
         parameters={
             "type": "object",
             "properties": {
-                "name": {"type": "string"}
+                "name": {"type": "string"},
+                "offset": {"type": "integer"},
+                "limit": {"type": "integer"},
+                "unit": {"type": "string", "enum": ["lines", "bytes"]}
             },
             "required": ["name"]
         },
+        terminal=False,
+        cacheable=Cacheable(file_args=("name",))
+    ))
+    action_registry.register(Action(
+        name="find_in_project",
+        function=find_in_project,
+        description="Finds lines (and file paths) in the project containing the given text, "
+                    "using an index that is kept up to date between runs.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "query": {"type": "string"},
+                "word": {"type": "boolean"},
+                "ignore_case": {"type": "boolean"}
+            },
+            "required": ["query"]
+        },
         terminal=False
     ))
     action_registry.register(Action(
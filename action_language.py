@@ -53,7 +53,71 @@ Available Tools: {json.dumps(action_descriptions, indent=4)}
         except Exception as e:
             print(f"Failed to parse response: {str(e)}")
             raise e
-        
+
+    def create_stream_parser(self) -> "ActionBlockParser":
+        """Parser for stream_generate_response that spots the closed action block"""
+        return ActionBlockParser()
+
+
+class ActionBlockParser:
+    """Incrementally watches a streamed response for a complete ```action block.
+
+    feed() is called with each new chunk and only searches the newly arrived text
+    (plus enough overlap to catch a marker split across chunks). Once the block
+    is closed and its JSON parses, feed() returns the invocation and the caller
+    can stop the stream.
+    """
+    start_marker = "```action"
+    end_marker = "```"
+
+    def __init__(self):
+        self.text = ""
+        self.search_from = 0      # next index to search for a marker
+        self.block_start = -1     # index just after the start marker
+        self.invocation = None
+
+    def feed(self, chunk: str):
+        if self.invocation is not None:
+            return self.invocation
+        self.text += chunk
+
+        if self.block_start < 0:
+            index = self.text.find(self.start_marker, self.search_from)
+            if index < 0:
+                self.search_from = max(0, len(self.text) - len(self.start_marker) + 1)
+                return None
+            self.block_start = index + len(self.start_marker)
+            self.search_from = self.block_start
+
+        while True:
+            end = self.text.find(self.end_marker, self.search_from)
+            if end < 0:
+                self.search_from = max(self.block_start,
+                                       len(self.text) - len(self.end_marker) + 1)
+                return None
+            try:
+                self.invocation = json.loads(self.text[self.block_start:end].strip())
+                return self.invocation
+            except ValueError:
+                # A ``` inside the JSON itself; keep looking for the real end
+                self.search_from = end + 1
+
+
+#Streaming With Early Action Dispatch
+"""The action JSON is usually finished long before the model stops writing.
+With a streaming generate_response and the incremental parser above, the agent
+stops the generation at the closing ``` and executes the tool right away:"""
+
+json_language = AgentJsonActionLanguage()
+streaming_agent = Agent(
+    goals=goals,
+    agent_language=json_language,
+    action_registry=registry,
+    generate_response=functools.partial(stream_generate_response,
+                                        make_parser=json_language.create_stream_parser),
+    environment=env
+)
+
 
 #Function Calling Language
 """This next language uses the LLM’s function calling capabilities to directly specify actions. 
@@ -1,22 +1,15 @@
 # Here is an example of how we might define some actions for a file management agent:
 
+from file_tools import list_tree, read_file_page, search_files
+
 def list_files() -> list:
     """List all files in the current directory."""
     return os.listdir('.')
 
-def read_file(file_name: str) -> str:
-    """Read and return the contents of a file."""
-    with open(file_name, 'r') as f:
-        return f.read()
-
-def search_in_file(file_name: str, search_term: str) -> list:
-    """Search for a term in a file and return matching lines."""
-    results = []
-    with open(file_name, 'r') as f:
-        for i, line in enumerate(f.readlines()):
-            if search_term in line:
-                results.append((i+1, line.strip()))
-    return results
+def read_file(file_name: str, offset: int = 0, limit: int = 200, unit: str = "lines") -> str:
+    """Read one page of a file. The first line of the result reports the file's total
+    size and line count and the offset of the next page."""
+    return read_file_page(file_name, offset, limit, unit)
 
 # Create and populate the action registry
 registry = ActionRegistry()
@@ -30,43 +23,104 @@ registry.register(Action(
         "properties": {},
         "required": []
     },
+    terminal=False,
+    cacheable=Cacheable(directories=(".",))
+))
+
+registry.register(Action(
+    name="list_tree",
+    function=list_tree,
+    description="List files and directories recursively with their sizes, skipping .gitignore'd paths",
+    parameters={
+        "type": "object",
+        "properties": {
+            "path": {
+                "type": "string",
+                "description": "Directory to list (default: the current directory)"
+            },
+            "max_depth": {
+                "type": "integer",
+                "description": "How many levels deep to list (default 3)"
+            },
+            "pattern": {
+                "type": "string",
+                "description": "Only list paths matching this glob, e.g. '*.py'"
+            },
+            "offset": {
+                "type": "integer",
+                "description": "Entry to start from; use next_offset from the previous call to continue"
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of entries to return (default 200)"
+            }
+        },
+        "required": []
+    },
     terminal=False
 ))
 
 registry.register(Action(
     name="read_file",
     function=read_file,
-    description="Read the contents of a specific file",
+    description="Read a page of a specific file; large files are read a page at a time",
     parameters={
         "type": "object",
         "properties": {
             "file_name": {
                 "type": "string",
                 "description": "Name of the file to read"
+            },
+            "offset": {
+                "type": "integer",
+                "description": "First line (or byte, with unit='bytes') to read; use the next offset from the header to continue"
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Number of lines (or bytes) to read, default 200 lines"
+            },
+            "unit": {
+                "type": "string",
+                "enum": ["lines", "bytes"],
+                "description": "Whether offset and limit count lines or bytes"
             }
         },
         "required": ["file_name"]
     },
-    terminal=False
+    terminal=False,
+    cacheable=Cacheable(file_args=("file_name",))
 ))
 
 registry.register(Action(
-    name="search_in_file",
-    function=search_in_file,
-    description="Search for a term in a specific file",
+    name="search_files",
+    function=search_files,
+    description="Search every file matching a glob for lines matching a regex, in one call. "
+                "Ignored (.gitignore) and binary files are skipped.",
     parameters={
         "type": "object",
         "properties": {
-            "file_name": {
-                "type": "string", 
-                "description": "Name of the file to search in"
+            "regex": {
+                "type": "string",
+                "description": "Regular expression to search for"
             },
-            "search_term": {
+            "pattern": {
                 "type": "string",
-                "description": "Term to search for"
+                "description": "Glob for the files to search, e.g. '*.py' or 'src/**/*.md' (default: all files)"
+            },
+            "context_lines": {
+                "type": "integer",
+                "description": "Lines of context to include before and after each match"
+            },
+            "max_matches": {
+                "type": "integer",
+                "description": "Stop after this many matching lines (default 100)"
+            },
+            "ignore_case": {
+                "type": "boolean",
+                "description": "Match case-insensitively"
             }
         },
-        "required": ["file_name", "search_term"]
+        "required": ["regex"]
     },
     terminal=False
 ))
\ No newline at end of file
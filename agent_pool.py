@@ -0,0 +1,184 @@
+#Running Many Agents Side by Side
+"""An AgentPool runs many Agent.run sessions on a fixed set of worker threads.
+
+Sessions are started in Goal.priority order (1 runs before 2), ties in submit order
+All sessions share one limit on how many LLM requests are in flight at once
+summary_executor is sized to that limit; give it to each session's TokenBudgetMemory
+so background summaries keep up with the sessions instead of queueing behind each other
+Each session records its own timings, and the pool reports aggregate throughput
+
+Usage:
+
+pool = AgentPool(max_workers=16, max_llm_in_flight=4)
+for path in paths:
+    pool.submit(create_file_processing_agent(), f"Summarize {path}",
+                memory=TokenBudgetMemory(executor=pool.summary_executor))
+pool.wait()
+print(pool.report())"""
+
+import copy
+import itertools
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+
+class AgentSession:
+    """One Agent.run call scheduled on the pool, with its own stats"""
+
+    def __init__(self, name: str, agent, user_input: str, memory=None, max_iterations: int = 50):
+        self.name = name
+        self.agent = agent
+        self.user_input = user_input
+        self.memory = memory
+        self.max_iterations = max_iterations
+        self.priority = min((goal.priority for goal in agent.goals), default=0)
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.llm_calls = 0
+        self.llm_seconds = 0.0       # time spent inside generate_response
+        self.llm_wait_seconds = 0.0  # time spent waiting for an LLM slot
+        self._done = threading.Event()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until the session finishes and return its final memory"""
+        self._done.wait(timeout)
+        if self.error is not None:
+            raise RuntimeError(f"Session {self.name} failed: {self.error}")
+        return self.result
+
+    def stats(self) -> dict:
+        run_seconds = (self.finished_at or time.time()) - self.started_at if self.started_at else 0.0
+        return {
+            "name": self.name,
+            "status": self.status,
+            "priority": self.priority,
+            "queued_seconds": (self.started_at or time.time()) - self.submitted_at,
+            "run_seconds": run_seconds,
+            "llm_calls": self.llm_calls,
+            "llm_seconds": self.llm_seconds,
+            "llm_wait_seconds": self.llm_wait_seconds,
+            "llm_calls_per_second": self.llm_calls / run_seconds if run_seconds else 0.0
+        }
+
+
+class AgentPool:
+    def __init__(self, max_workers: int = 8, max_llm_in_flight: int = 4):
+        self.max_workers = max_workers
+        self.max_llm_in_flight = max_llm_in_flight
+        self.sessions: List[AgentSession] = []
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._llm_slots = threading.BoundedSemaphore(max_llm_in_flight)
+        self.summary_executor = ThreadPoolExecutor(max_workers=max_llm_in_flight,
+                                                   thread_name_prefix="agent-pool-summarize")
+        self._lock = threading.Lock()
+        self._workers = []
+        self._started_at = None
+
+    def submit(self, agent, user_input: str, memory=None,
+               max_iterations: int = 50, name: str = None) -> AgentSession:
+        session = AgentSession(name or f"session-{len(self.sessions)}",
+                               agent, user_input, memory, max_iterations)
+        with self._lock:
+            self.sessions.append(session)
+            if self._started_at is None:
+                self._started_at = time.time()
+            self._ensure_workers()
+        self._queue.put((session.priority, next(self._order), session))
+        return session
+
+    def _ensure_workers(self):
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._work, daemon=True,
+                                      name=f"agent-pool-{len(self._workers)}")
+            worker.start()
+            self._workers.append(worker)
+
+    def _work(self):
+        while True:
+            _, _, session = self._queue.get()
+            if session is None:
+                return
+            self._run(session)
+            self._queue.task_done()
+
+    def _run(self, session: AgentSession):
+        # The same agent may back many sessions, so each one runs on its own shallow
+        # copy carrying its limiter; the submitted agent is never modified
+        agent = copy.copy(session.agent)
+        agent.generate_response = self._limit(session.agent.generate_response, session)
+        session.status = "running"
+        session.started_at = time.time()
+        try:
+            session.result = agent.run(session.user_input, memory=session.memory,
+                                       max_iterations=session.max_iterations)
+            session.status = "finished"
+        except Exception as e:
+            session.error = f"{e}\n{traceback.format_exc()}"
+            session.status = "failed"
+        finally:
+            session.finished_at = time.time()
+            session._done.set()
+
+    def _limit(self, generate_response: Callable, session: AgentSession) -> Callable:
+        """Wrap generate_response so it takes one of the pool's shared LLM slots"""
+
+        @wraps(generate_response)
+        def limited_generate_response(prompt):
+            waited = time.time()
+            with self._llm_slots:
+                started = time.time()
+                session.llm_wait_seconds += started - waited
+                try:
+                    return generate_response(prompt)
+                finally:
+                    session.llm_calls += 1
+                    session.llm_seconds += time.time() - started
+
+        return limited_generate_response
+
+    def wait(self):
+        """Block until every submitted session has finished"""
+        self._queue.join()
+
+    def shutdown(self):
+        self.wait()
+        for _ in self._workers:
+            # Sentinels sort after every real session
+            self._queue.put((float("inf"), next(self._order), None))
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        self.summary_executor.shutdown(wait=True)
+
+    def report(self) -> Dict:
+        """Per-session stats plus aggregate throughput for the pool"""
+        sessions = [s.stats() for s in self.sessions]
+        finished = [s for s in self.sessions if s.finished_at]
+        elapsed = (max(s.finished_at for s in finished) - self._started_at) if finished else 0.0
+        llm_calls = sum(s.llm_calls for s in self.sessions)
+        return {
+            "sessions": sessions,
+            "aggregate": {
+                "submitted": len(self.sessions),
+                "finished": sum(1 for s in self.sessions if s.status == "finished"),
+                "failed": sum(1 for s in self.sessions if s.status == "failed"),
+                "elapsed_seconds": elapsed,
+                "sessions_per_second": len(finished) / elapsed if elapsed else 0.0,
+                "llm_calls": llm_calls,
+                "llm_calls_per_second": llm_calls / elapsed if elapsed else 0.0,
+                "avg_llm_seconds": (sum(s.llm_seconds for s in self.sessions) / llm_calls
+                                    if llm_calls else 0.0),
+                "avg_llm_wait_seconds": (sum(s.llm_wait_seconds for s in self.sessions) / llm_calls
+                                         if llm_calls else 0.0)
+            }
+        }
@@ -23,7 +23,8 @@ def main():
         function=list_project_files,
         description="Lists all files in the project.",
         parameters={},
-        terminal=False
+        terminal=False,
+        cacheable=Cacheable(directories=(".",))
     ))
     action_registry.register(Action(
         name="read_project_file",
@@ -36,7 +37,8 @@ def main():
             },
             "required": ["name"]
         },
-        terminal=False
+        terminal=False,
+        cacheable=Cacheable(file_args=("name",))
     ))
     action_registry.register(Action(
         name="terminate",
@@ -1,6 +1,8 @@
 #Complete Implementation
 #Here’s the full implementation using the GAME framework:
 
+from project_index import find_in_project
+
 def main():
     # Define the agent's goals
     goals = [
@@ -43,7 +45,8 @@ def main():
         function=list_files,
         description="Returns a list of files in the directory.",
         parameters={},
-        terminal=False
+        terminal=False,
+        cacheable=Cacheable(directories=(".",))
     ))
     
     action_registry.register(Action(
@@ -57,6 +60,24 @@ def main():
             },
             "required": ["file_name"]
         },
+        terminal=False,
+        cacheable=Cacheable(file_args=("file_name",))
+    ))
+    
+    action_registry.register(Action(
+        name="find_in_project",
+        function=find_in_project,
+        description="Finds lines and file paths containing the given text anywhere in the project. "
+                    "Much faster than listing and reading files one by one.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "query": {"type": "string"},
+                "word": {"type": "boolean"},
+                "ignore_case": {"type": "boolean"}
+            },
+            "required": ["query"]
+        },
         terminal=False
     ))
     
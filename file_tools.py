@@ -0,0 +1,553 @@
+#Reading Large Files a Page at a Time
+"""Reading a whole file with f.read() and putting it into Memory breaks down for
+multi-hundred-MB logs: it blows up both RAM and the context window. These helpers
+read one page of a file through a memory map instead:
+
+Pages are selected by lines or by bytes (offset + limit)
+The encoding is detected from a BOM or a sample of the file
+Every page starts with a header giving the total size, line count and the
+offset of the next page, so the agent can keep paging
+
+Memory use stays constant: line positions are found by scanning the map in 1 MB
+chunks, and a small per-file index (newline counts per chunk) is kept so later
+pages don't rescan the file."""
+
+import codecs
+import fnmatch
+import mmap
+import multiprocessing
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+CHUNK_SIZE = 1 << 20
+SAMPLE_SIZE = 64 * 1024
+DEFAULT_LINE_LIMIT = 200
+DEFAULT_BYTE_LIMIT = 64 * 1024
+MAX_PAGE_BYTES = 1 << 20
+
+_BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+
+
+def detect_encoding(sample: bytes) -> tuple:
+    """Return (encoding, bom_length), or (None, 0) for binary data"""
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding, len(bom)
+    if b"\x00" in sample:
+        return None, 0
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8", 0
+    except UnicodeDecodeError:
+        pass
+    try:
+        from charset_normalizer import from_bytes
+        match = from_bytes(sample).best()
+        if match is not None:
+            return match.encoding, 0
+    except ImportError:
+        pass
+    return "latin-1", 0
+
+
+class _FileIndex:
+    """Newline counts for each 1 MB chunk of one version of a file"""
+
+    def __init__(self, mm, size: int, encoding: str, bom: int):
+        self.size = size
+        self.encoding = encoding
+        self.bom = bom
+        self.newline = "\n".encode(encoding) if encoding else b"\n"
+        # lines_before[j] = newlines in bytes [0, j * CHUNK_SIZE)
+        self.lines_before = array("q", [0])
+        for start in range(0, size, CHUNK_SIZE):
+            chunk = mm[start:start + CHUNK_SIZE]
+            self.lines_before.append(self.lines_before[-1] + chunk.count(self.newline))
+        newlines = self.lines_before[-1]
+        ends_with_newline = size > bom and mm[size - len(self.newline):size] == self.newline
+        self.line_count = newlines + (0 if size <= bom or ends_with_newline else 1)
+
+    def line_start(self, mm, line: int) -> int:
+        """Byte offset where the given (0-based) line starts"""
+        if line <= 0:
+            return self.bom
+        if line > self.lines_before[-1]:
+            return self.size
+        # The chunk that contains the line-th newline
+        j = bisect_left(self.lines_before, line) - 1
+        remaining = line - self.lines_before[j]
+        chunk_start = j * CHUNK_SIZE
+        chunk = mm[chunk_start:chunk_start + CHUNK_SIZE]
+        pos = -len(self.newline)
+        for _ in range(remaining):
+            pos = chunk.find(self.newline, pos + len(self.newline))
+        return chunk_start + pos + len(self.newline)
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _get_index(path: str, mm, stat) -> _FileIndex:
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+    encoding, bom = detect_encoding(mm[:SAMPLE_SIZE])
+    index = _FileIndex(mm, stat.st_size, encoding, bom)
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > 64:
+            _indexes.popitem(last=False)
+    return index
+
+
+def _align_utf8(mm, pos: int, size: int) -> int:
+    """Move pos forward off UTF-8 continuation bytes so a page never splits a character"""
+    while pos < size and 0x80 <= mm[pos] <= 0xBF:
+        pos += 1
+    return pos
+
+
+def read_file_page(path: str, offset: int = 0, limit: Optional[int] = None,
+                   unit: str = "lines", encoding: Optional[str] = None) -> str:
+    """Read one page of a file.
+
+    unit="lines": offset is the first line (0-based), limit the number of lines
+    unit="bytes": offset and limit are byte positions
+    The result starts with a header line describing the file and the next offset.
+    """
+    if unit not in ("lines", "bytes"):
+        raise ValueError("unit must be 'lines' or 'bytes'")
+    offset = max(0, int(offset or 0))
+
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size == 0:
+            return f"[{path}: 0 bytes, 0 lines]\n"
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            index = _get_index(path, mm, stat)
+            file_encoding = encoding or index.encoding
+            summary = (f"{path}: {index.size} bytes, {index.line_count} lines, "
+                       f"{file_encoding or 'binary'}")
+            if file_encoding is None:
+                return f"[{summary}; binary file, not shown]\n"
+
+            if unit == "lines":
+                limit = DEFAULT_LINE_LIMIT if limit is None else max(1, int(limit))
+                start = index.line_start(mm, offset)
+                end = index.line_start(mm, offset + limit)
+                truncated = end - start > MAX_PAGE_BYTES
+                if truncated:
+                    end = start + MAX_PAGE_BYTES
+                    if file_encoding == "utf-8":
+                        end = _align_utf8(mm, end, index.size)
+                last = min(offset + limit, index.line_count)
+                if offset >= index.line_count:
+                    position = f"offset {offset} is past the end"
+                elif truncated:
+                    position = (f"showing the first {MAX_PAGE_BYTES} bytes of lines "
+                                f"{offset}-{last - 1}; use unit='bytes' with offset={end} to continue")
+                else:
+                    position = f"showing lines {offset}-{last - 1}"
+                    if last < index.line_count:
+                        position += f"; next offset={last}"
+            else:
+                limit = DEFAULT_BYTE_LIMIT if limit is None else max(1, int(limit))
+                limit = min(limit, MAX_PAGE_BYTES)
+                start = max(offset, index.bom)
+                end = min(index.size, start + limit)
+                if file_encoding == "utf-8":
+                    start = _align_utf8(mm, start, index.size)
+                    end = _align_utf8(mm, end, index.size)
+                if start >= index.size:
+                    position = f"offset {offset} is past the end"
+                else:
+                    position = f"showing bytes {start}-{end - 1}"
+                    if end < index.size:
+                        position += f"; next offset={end}"
+
+            text = mm[start:end].decode(file_encoding, errors="replace")
+
+    return f"[{summary}; {position}]\n{text}"
+
+
+#Searching Many Files at Once
+"""search_files replaces calling a per-file search once for every file. It walks the project
+(skipping .gitignore'd paths, VCS/cache directories and binary files) and runs the
+regex over a memory map of each file that matches a glob, so no file is ever read
+into a list of lines.
+
+The regex engine holds the GIL, so threads only overlap the I/O. Small files are
+scanned on a thread pool, where that is all they need; files of PROCESS_SEARCH_BYTES
+or more are scanned in worker processes, which run the regex on several cores.
+
+iter_search_matches yields matches as soon as each file is scanned (in walk order),
+and stops scanning once max_matches is reached."""
+
+ALWAYS_IGNORED = {".git", ".hg", ".svn", "__pycache__", "node_modules", ".venv", "venv",
+                  ".mypy_cache", ".pytest_cache", ".tox"}
+BINARY_SNIFF_BYTES = 8192
+PROCESS_SEARCH_BYTES = 4 * 1024 * 1024  # files this large are scanned in a worker process
+
+
+class GitIgnore:
+    """The subset of .gitignore matching the agents need: globs, negation (!),
+    directory-only rules (trailing /), anchored rules (containing /) and nested
+    .gitignore files, which apply below their own directory."""
+
+    def __init__(self, root: str = "."):
+        self.root = root
+        self.rules = []  # (base directory, pattern, negated, dir_only, anchored)
+        self._loaded = set()
+
+    def load(self, directory: str = ""):
+        """Read directory/.gitignore (relative to root) once"""
+        if directory in self._loaded:
+            return
+        self._loaded.add(directory)
+        path = os.path.join(self.root, directory, ".gitignore")
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            line = line[1:] if negated else line
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            self.rules.append((directory, line.lstrip("/"), negated, dir_only, anchored))
+
+    def ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """rel_path uses / separators and is relative to root"""
+        name = rel_path.rsplit("/", 1)[-1]
+        if is_dir and name in ALWAYS_IGNORED:
+            return True
+        result = False
+        for base, pattern, negated, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not rel_path.startswith(base + "/"):
+                    continue
+                path = rel_path[len(base) + 1:]
+            else:
+                path = rel_path
+            target = path if anchored else name
+            if fnmatch.fnmatchcase(target, pattern) or (
+                    anchored and pattern.startswith("**/") and fnmatch.fnmatchcase(path, pattern[3:])):
+                result = not negated
+        return result
+
+
+def glob_matches(rel_path: str, pattern: str) -> bool:
+    """Patterns without / match the file name at any depth; "**/" may match no directories"""
+    if "/" not in pattern:
+        return fnmatch.fnmatchcase(rel_path.rsplit("/", 1)[-1], pattern)
+    return (fnmatch.fnmatchcase(rel_path, pattern)
+            or fnmatch.fnmatchcase(rel_path, pattern.replace("**/", "")))
+
+
+def walk_files(root: str = ".", pattern: str = "*", gitignore: Optional[GitIgnore] = None) -> Iterator[str]:
+    """Yield paths (relative to root, / separated) of files matching pattern, skipping ignored ones"""
+    gitignore = gitignore or GitIgnore(root)
+    stack = [""]
+    while stack:
+        directory = stack.pop()
+        gitignore.load(directory)
+        try:
+            with os.scandir(os.path.join(root, directory)) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            rel_path = f"{directory}/{entry.name}" if directory else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if gitignore.ignored(rel_path, is_dir):
+                continue
+            if is_dir:
+                subdirs.append(rel_path)
+            elif entry.is_file() and glob_matches(rel_path, pattern):
+                yield rel_path
+        stack.extend(reversed(subdirs))
+
+
+def _line_bounds(mm, start: int, end: int, size: int) -> tuple:
+    line_start = mm.rfind(b"\n", 0, start) + 1
+    line_end = mm.find(b"\n", end)
+    return line_start, size if line_end < 0 else line_end
+
+
+def search_file(path: str, regex, context_lines: int = 0, max_matches: int = 100,
+                display_path: Optional[str] = None) -> List[Dict]:
+    """All lines of one file that match a compiled bytes regex (empty for binary files)"""
+    matches = []
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return matches
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if b"\x00" in mm[:BINARY_SNIFF_BYTES]:
+                return matches
+            line_number, counted_to = 1, 0
+            pos = 0
+            while len(matches) < max_matches:
+                found = regex.search(mm, pos)
+                if found is None:
+                    break
+                start, end = _line_bounds(mm, found.start(), found.end(), size)
+                line_number += mm[counted_to:start].count(b"\n")
+                counted_to = start
+                match = {"file": display_path or path, "line": line_number,
+                         "text": mm[start:end].decode("utf-8", errors="replace").rstrip("\r")}
+                if context_lines:
+                    before, cursor = [], start
+                    for _ in range(context_lines):
+                        if cursor == 0:
+                            break
+                        previous = mm.rfind(b"\n", 0, cursor - 1) + 1
+                        before.append(mm[previous:cursor - 1])
+                        cursor = previous
+                    after, cursor = [], end
+                    for _ in range(context_lines):
+                        if cursor >= size - 1:
+                            break
+                        following = mm.find(b"\n", cursor + 1)
+                        following = size if following < 0 else following
+                        after.append(mm[cursor + 1:following])
+                        cursor = following
+                    match["before"] = [b.decode("utf-8", errors="replace").rstrip("\r") for b in reversed(before)]
+                    match["after"] = [a.decode("utf-8", errors="replace").rstrip("\r") for a in after]
+                matches.append(match)
+                # One match per line: continue after this line
+                pos = end + 1
+                if pos >= size:
+                    break
+    return matches
+
+
+def iter_search_matches(regex: str, pattern: str = "*", root: str = ".",
+                        context_lines: int = 0, max_matches: int = 100,
+                        ignore_case: bool = False, max_workers: int = 8) -> Iterator[Dict]:
+    """Yield matches file by file while later files are still being scanned"""
+    # The whole file is searched at once, so ^ and $ need MULTILINE to anchor at each line
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    compiled = re.compile(regex.encode("utf-8"), flags)
+    files = walk_files(root, pattern)
+    remaining = max_matches
+    processes = None  # started on the first large file
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+
+        def submit_next() -> bool:
+            nonlocal processes
+            rel_path = next(files, None)
+            if rel_path is None:
+                return False
+            path = os.path.join(root, rel_path)
+            try:
+                large = os.path.getsize(path) >= PROCESS_SEARCH_BYTES
+            except OSError:
+                large = False
+            target = executor
+            if large and (os.cpu_count() or 1) > 1:
+                if processes is None:
+                    # Not fork: the agent process already runs threads whose locks a fork would copy
+                    methods = multiprocessing.get_all_start_methods()
+                    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                    processes = ProcessPoolExecutor(max_workers=min(max_workers, os.cpu_count()),
+                                                    mp_context=context)
+                target = processes
+            pending.append(target.submit(search_file, path, compiled,
+                                         context_lines, max_matches, rel_path))
+            return True
+
+        try:
+            # Keep a bounded window of files in flight, consumed in walk order
+            while len(pending) < max_workers * 4 and submit_next():
+                pass
+            while pending and remaining > 0:
+                try:
+                    file_matches = pending.popleft().result()
+                except OSError:
+                    file_matches = []
+                submit_next()
+                for match in file_matches[:remaining]:
+                    yield match
+                remaining -= min(len(file_matches), remaining)
+        finally:
+            for future in pending:
+                future.cancel()
+            if processes is not None:
+                processes.shutdown(wait=False, cancel_futures=True)
+
+def search_files(regex: str, pattern: str = "*", context_lines: int = 0,
+                 max_matches: int = 100, ignore_case: bool = False) -> Dict:
+    """Search every non-ignored text file matching pattern for lines matching regex"""
+    # One match past the limit tells whether anything was left out
+    matches = list(iter_search_matches(regex, pattern, ".", context_lines, max_matches + 1, ignore_case))
+    truncated = len(matches) > max_matches
+    matches = matches[:max_matches]
+    return {
+        "matches": matches,
+        "files_with_matches": len({m["file"] for m in matches}),
+        "truncated": truncated
+    }
+
+
+#Listing a Directory Tree
+"""list_tree gives the agent a recursive view of the project in one call, where
+list_files only showed os.listdir('.'). Directories are read with os.scandir on a
+thread pool, one level at a time, and each directory's listing is cached with its
+mtime. A directory whose mtime hasn't changed isn't read again, so repeated calls
+cost one stat per directory. (A file's size is refreshed when its directory next
+changes.)"""
+
+MAX_CACHED_LISTINGS = 4096   # directories
+MAX_CACHED_SNAPSHOTS = 32     # (root, max_depth, pattern) combinations
+
+# Both caches are LRUs, so a long session can't grow them without bound
+_listings = OrderedDict()   # absolute directory path -> (mtime_ns, [(name, is_dir, size)])
+_snapshots = OrderedDict()  # (root, max_depth, pattern) -> (validators, entries, deeper directories)
+_listings_lock = threading.Lock()
+
+
+def _cache_get(cache: OrderedDict, key):
+    with _listings_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def _cache_put(cache: OrderedDict, key, value, max_size: int):
+    with _listings_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+
+
+def _mtime_ns(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _scan_directory(path: str) -> Tuple[Optional[int], Optional[List[tuple]]]:
+    """(mtime_ns, sorted (name, is_dir, size) entries); entries is None if unreadable"""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None, None
+    cached = _cache_get(_listings, path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached
+    entries = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    size = 0 if is_dir else entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+                entries.append((entry.name, is_dir, size))
+    except OSError:
+        return mtime_ns, None
+    entries.sort()
+    _cache_put(_listings, path, (mtime_ns, entries), MAX_CACHED_LISTINGS)
+    return mtime_ns, entries
+
+
+def list_tree(path: str = ".", max_depth: int = 3, pattern: str = "*",
+              offset: int = 0, limit: Optional[int] = 200, max_workers: int = 8) -> Dict:
+    """Files and directories under path (up to max_depth levels), skipping ignored
+    ones. Entries whose path matches pattern are returned sorted, limit at a time
+    (limit=None returns them all)."""
+    if limit is not None and limit < 0:
+        raise ValueError("limit must be zero or more (or None for all entries)")
+    key = (os.path.abspath(path), max_depth, pattern)
+    snapshot = _cache_get(_snapshots, key)
+    if snapshot is not None and all(_mtime_ns(p) == m for p, m in snapshot[0]):
+        _, results, deeper = snapshot
+    else:
+        results, deeper, validators = _walk_tree(path, max_depth, pattern, max_workers)
+        _cache_put(_snapshots, key, (validators, results, deeper), MAX_CACHED_SNAPSHOTS)
+
+    offset = max(0, offset)
+    page = results[offset:] if limit is None else results[offset:offset + limit]
+    listing = {"entries": page, "total": len(results)}
+    if offset + len(page) < len(results):
+        listing["next_offset"] = offset + len(page)
+    if deeper:
+        listing["deeper_directories"] = deeper
+    return listing
+
+
+def _walk_tree(path: str, max_depth: int, pattern: str, max_workers: int) -> tuple:
+    """Breadth-first scan; returns the sorted entries, the number of directories left
+    below max_depth, and the (path, mtime) pairs that decide whether it is still valid"""
+    gitignore = GitIgnore(path)
+    results = []
+    validators = []
+    frontier = [""]
+    executor = None
+    try:
+        for _ in range(max(1, max_depth)):
+            if not frontier:
+                break
+            full_paths = [os.path.abspath(os.path.join(path, d)) for d in frontier]
+            if len(frontier) > 1:
+                executor = executor or ThreadPoolExecutor(max_workers=max_workers)
+                listings = list(executor.map(_scan_directory, full_paths))
+            else:
+                listings = [_scan_directory(full_paths[0])]
+            next_frontier = []
+            for directory, full_path, (mtime_ns, entries) in zip(frontier, full_paths, listings):
+                validators.append((full_path, mtime_ns))
+                if entries is None:
+                    continue
+                gitignore.load(directory)
+                for name, is_dir, size in entries:
+                    rel_path = f"{directory}/{name}" if directory else name
+                    if name == ".gitignore":
+                        validators.append((os.path.join(full_path, name), _mtime_ns(os.path.join(full_path, name))))
+                    if gitignore.ignored(rel_path, is_dir):
+                        continue
+                    if is_dir:
+                        next_frontier.append(rel_path)
+                    if glob_matches(rel_path, pattern):
+                        results.append({"path": rel_path + "/" if is_dir else rel_path,
+                                        "type": "dir" if is_dir else "file",
+                                        "size": size})
+            frontier = next_frontier
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    results.sort(key=lambda entry: entry["path"])
+    return results, len(frontier), validators
@@ -6,16 +6,19 @@ import os
 from typing import List
 
 from litellm import completion
+from file_tools import read_file_page
+from llm_rate_limit import rate_limited
+
+completion = rate_limited(completion)
 
 def list_files() -> List[str]:
     """List files in the current directory."""
     return os.listdir(".")
 
-def read_file(file_name: str) -> str:
-    """Read a file's contents."""
+def read_file(file_name: str, offset: int = 0, limit: int = 200, unit: str = "lines") -> str:
+    """Read one page of a file's contents (see file_tools.read_file_page)."""
     try:
-        with open(file_name, "r") as file:
-            return file.read()
+        return read_file_page(file_name, offset, limit, unit)
     except FileNotFoundError:
         return f"Error: {file_name} not found."
     except Exception as e:
@@ -46,10 +49,16 @@ tools = [
         "type": "function",
         "function": {
             "name": "read_file",
-            "description": "Reads the content of a specified file in the directory.",
+            "description": "Reads a page of a specified file in the directory. The first line "
+                           "gives the total size and line count and the offset of the next page.",
             "parameters": {
                 "type": "object",
-                "properties": {"file_name": {"type": "string"}},
+                "properties": {
+                    "file_name": {"type": "string"},
+                    "offset": {"type": "integer", "description": "First line (or byte) to read"},
+                    "limit": {"type": "integer", "description": "Number of lines (or bytes) to read"},
+                    "unit": {"type": "string", "enum": ["lines", "bytes"]}
+                },
                 "required": ["file_name"]
             }
         }
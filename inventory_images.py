@@ -0,0 +1,310 @@
+#Describing Inventory Photos in Bulk
+"""process_inventory_image used to base64-encode every photo at full resolution and
+make one blocking completion per image. ImageDescriber runs a pipeline instead:
+
+Each file is content-hashed (streamed, never fully loaded for hashing), and photos
+with the same bytes are described once
+Descriptions are cached by hash, so a photo seen in an earlier run costs nothing
+Photos are downsized to max_dimension before encoding (JPEG draft mode decodes
+them at reduced size to begin with)
+Several photos are described in one request: as many as the model's output token
+limit allows at max_tokens_per_image each (at most MAX_IMAGES_PER_REQUEST). If the
+provider rejects a batch as too large, it is split and the smaller size is kept
+Files that can't be read, and batches whose request fails, get an error description
+instead of failing the whole run
+A directory is processed on a thread pool with a bounded number of batches in
+flight, so only a few encoded images are in memory at any time
+
+Usage:
+
+describer = ImageDescriber(cache=LLMResponseCache(path="llm_cache.sqlite"))
+describer.describe("shoes.jpg")
+describer.describe_directory("photos/")
+
+shared_describer() returns one process-wide describer with an on-disk cache, for
+callers that don't bring their own."""
+
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from litellm import completion
+from PIL import Image, ImageOps
+
+try:
+    from litellm import get_model_info
+except ImportError:
+    get_model_info = None
+
+from llm_cache import LLMResponseCache
+from llm_rate_limit import rate_limited
+
+completion = rate_limited(completion)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff"}
+MAX_IMAGES_PER_REQUEST = 16  # keeps a request's payload modest even for large output limits
+SHARED_CACHE_PATH = "inventory_image_cache.sqlite"
+
+DESCRIBE_PROMPT = """Please describe this item for inventory purposes.
+Include details about:
+- What the item is
+- Its key features
+- The condition it's in
+- Any visible wear or damage
+- Anything notable about it"""
+
+DESCRIBE_MANY_PROMPT = DESCRIBE_PROMPT.replace("this item", "each of the {count} items shown, one per image,") + """
+
+Respond with a JSON object {{"descriptions": [...]}} holding one description per image, in the order the images were given."""
+
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_image(path: str, max_dimension: int = 1024, quality: int = 85) -> str:
+    """Downsized JPEG of the image as a data URL"""
+    with Image.open(path) as image:
+        # For JPEGs, decode at the smallest scale that is still >= max_dimension
+        image.draft("RGB", (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((max_dimension, max_dimension))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def response_text(response) -> str:
+    return response.choices[0].message.content or ""
+
+
+def images_per_request_for(model: str, max_tokens_per_image: int) -> int:
+    """How many images one request can describe: the model's output token limit
+    divided by the tokens allowed per image (1 if the limit is unknown)"""
+    try:
+        max_output = get_model_info(model).get("max_output_tokens") if get_model_info else None
+    except Exception:
+        # litellm doesn't know this model
+        max_output = None
+    if not max_output:
+        return 1
+    return max(1, min(MAX_IMAGES_PER_REQUEST, max_output // max_tokens_per_image))
+
+
+TOO_LARGE_MESSAGE = re.compile(r"context.{0,10}(length|window)|too many images|maximum.{0,40}images",
+                               re.IGNORECASE)
+
+
+def is_request_too_large(error: Exception) -> bool:
+    """413, or a rejection that says the request had too many images or tokens.
+    Other 400s (an unsupported response_format, one corrupt image) are not about size."""
+    if getattr(error, "status_code", None) == 413 or type(error).__name__ == "ContextWindowExceededError":
+        return True
+    return getattr(error, "status_code", None) == 400 and bool(TOO_LARGE_MESSAGE.search(str(error)))
+
+
+def is_bad_request(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 400
+
+
+class ImageDescriber:
+    def __init__(self,
+                 cache: Optional[LLMResponseCache] = None,
+                 model: str = "openai/gpt-4o",
+                 max_dimension: int = 1024,
+                 images_per_request: Optional[int] = None,
+                 max_tokens_per_image: int = 1000,
+                 max_workers: int = 4):
+        """
+        cache: where descriptions are kept by image hash (in-memory LRU if None)
+        images_per_request: photos sent together in one request (1 disables batching;
+                            None works it out from the model's output token limit)
+        max_workers: batches prepared and described concurrently; this also bounds
+                     how many encoded images are held in memory
+        """
+        self.cache = cache or LLMResponseCache()
+        self.model = model
+        self.max_dimension = max_dimension
+        self.max_tokens_per_image = max_tokens_per_image
+        self.images_per_request = max(1, images_per_request or
+                                      images_per_request_for(model, max_tokens_per_image))
+        self.max_workers = max_workers
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def cache_key(self, image_hash: str) -> str:
+        # The image is identified by its hash; the size it is sent at changes the answer
+        messages = [{"image_sha256": image_hash, "max_dimension": self.max_dimension,
+                     "prompt": DESCRIBE_PROMPT}]
+        return self.cache.make_key(self.model, messages, [], self.max_tokens_per_image)
+
+    #Requests
+
+    def _count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def _describe_one(self, data_url: str) -> str:
+        self._count_request()
+        response = completion(
+            model=self.model,
+            messages=[{
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": DESCRIBE_PROMPT},
+                    {"type": "image_url", "image_url": {"url": data_url}}
+                ]
+            }],
+            max_tokens=self.max_tokens_per_image
+        )
+        return response_text(response)
+
+    def _describe_one_or_error(self, data_url: str) -> str:
+        try:
+            return self._describe_one(data_url)
+        except Exception as e:
+            if not is_bad_request(e):
+                raise
+            return f"Error: could not describe image: {e}"
+
+    def _describe_batch(self, data_urls: List[str]) -> List[str]:
+        if len(data_urls) == 1:
+            return [self._describe_one(data_urls[0])]
+        self._count_request()
+        content = [{"type": "text", "text": DESCRIBE_MANY_PROMPT.format(count=len(data_urls))}]
+        content += [{"type": "image_url", "image_url": {"url": url}} for url in data_urls]
+        try:
+            response = completion(
+                model=self.model,
+                messages=[{"role": "user", "content": content}],
+                max_tokens=self.max_tokens_per_image * len(data_urls),
+                response_format={"type": "json_object"}
+            )
+        except Exception as e:
+            if not is_request_too_large(e):
+                if not is_bad_request(e):
+                    raise
+                # Something in this batch was rejected; describe its images one by one
+                # so only the image at fault fails, and keep the batch size as it is
+                return [self._describe_one_or_error(url) for url in data_urls]
+            # Too many images for this model: use half as many from now on
+            half = len(data_urls) // 2
+            with self._lock:
+                self.images_per_request = max(1, min(self.images_per_request, half))
+            return self._describe_batch(data_urls[:half]) + self._describe_batch(data_urls[half:])
+        try:
+            descriptions = json.loads(response_text(response))["descriptions"]
+            if len(descriptions) == len(data_urls) and all(isinstance(d, str) for d in descriptions):
+                return descriptions
+        except (ValueError, KeyError, TypeError):
+            pass
+        # The model didn't answer one-per-image; fall back to separate requests
+        return [self._describe_one(url) for url in data_urls]
+
+    def _process_batch(self, batch: List[Tuple[str, str]]) -> Dict[str, str]:
+        """Describe (hash, path) pairs that missed the cache; returns hash -> description"""
+        results = {}
+        readable, data_urls = [], []
+        for image_hash, path in batch:
+            try:
+                data_urls.append(encode_image(path, self.max_dimension))
+                readable.append(image_hash)
+            except (OSError, ValueError) as e:
+                # Not cached, so a fixed file is described next time
+                results[image_hash] = f"Error: could not read image {path}: {e}"
+        if data_urls:
+            try:
+                descriptions = self._describe_batch(data_urls)
+            except Exception as e:
+                # Report the failure for this batch only; the other batches keep their results
+                descriptions = [f"Error: could not describe image: {e}"] * len(readable)
+            for image_hash, description in zip(readable, descriptions):
+                if not description.startswith("Error:"):
+                    # Errors aren't cached, so the image is tried again next time
+                    self.cache.put(self.cache_key(image_hash), description)
+                results[image_hash] = description
+        return results
+
+    #Public API
+
+    def describe(self, path: str) -> str:
+        return self.describe_many([path])[path]
+
+    def describe_many(self, paths: Sequence[str]) -> Dict[str, str]:
+        """Descriptions for every path; duplicates and cached photos cost no request.
+        A file that can't be read, or a batch whose request failed, gets an error
+        message ("Error: ...") as its description."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            hashes = dict(zip(paths, executor.map(self._hash_or_error, paths)))
+
+            descriptions: Dict[str, str] = {}
+            misses: Dict[str, str] = {}  # hash -> one path with that content
+            for path, image_hash in hashes.items():
+                if image_hash in descriptions or image_hash in misses:
+                    continue
+                if image_hash.startswith("Error:"):
+                    descriptions[image_hash] = image_hash
+                    continue
+                cached = self.cache.get(self.cache_key(image_hash))
+                if cached is not None:
+                    descriptions[image_hash] = cached
+                else:
+                    misses[image_hash] = path
+
+            misses = list(misses.items())
+            size = self.images_per_request
+            batches = [misses[i:i + size] for i in range(0, len(misses), size)]
+            # Only max_workers batches (and their encoded images) are in flight at once
+            pending = deque()
+            for batch in batches:
+                if len(pending) >= self.max_workers:
+                    descriptions.update(pending.popleft().result())
+                pending.append(executor.submit(self._process_batch, batch))
+            while pending:
+                descriptions.update(pending.popleft().result())
+
+        return {path: descriptions[image_hash] for path, image_hash in hashes.items()}
+
+    @staticmethod
+    def _hash_or_error(path: str) -> str:
+        try:
+            return hash_file(path)
+        except OSError as e:
+            # Unique per path, so it never matches a real hash or another file's error
+            return f"Error: could not read image {path}: {e}"
+
+    def describe_directory(self, directory: str, recursive: bool = False) -> Dict[str, str]:
+        paths = []
+        for root, dirs, files in os.walk(directory):
+            paths.extend(os.path.join(root, name) for name in sorted(files)
+                         if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS)
+            if not recursive:
+                break
+        return self.describe_many(paths)
+
+
+_shared_describer = None
+_shared_lock = threading.Lock()
+
+
+def shared_describer() -> ImageDescriber:
+    """One describer for the whole process, caching descriptions in SHARED_CACHE_PATH
+    so repeated and duplicate photos are described once, across calls and runs"""
+    global _shared_describer
+    with _shared_lock:
+        if _shared_describer is None:
+            _shared_describer = ImageDescriber(cache=LLMResponseCache(path=SHARED_CACHE_PATH))
+        return _shared_describer
@@ -0,0 +1,235 @@
+#Finding Similar Inventory Items
+"""The only way to answer "items like these red Jordans" used to be get_inventory and
+having the LLM read everything. InventoryVectorIndex embeds each item locally and
+answers with a cosine-similarity top-k instead:
+
+Embeddings are hashed bag-of-words vectors (words, word pairs and character
+trigrams, so "jordans" still matches "Jordan"), weighted by TF-IDF at query time.
+No model or network is needed
+Vectors live in a memory-mapped file that grows as items are added, and each
+save_item adds its vector immediately
+Queries are scored in blocks of rows, several queries at a time, so memory stays
+bounded however large the inventory gets
+
+Usage:
+
+index = InventoryVectorIndex("inventory_vectors")
+index.add(item["id"], item_text(item))
+index.search(["red Air Jordan sneakers"], top_k=5)"""
+
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = {"a", "an", "and", "are", "for", "in", "is", "it", "item", "items", "like", "of",
+              "on", "or", "some", "that", "the", "these", "this", "those", "to", "with"}
+CHAR_NGRAM_WEIGHT = 0.5
+SCORE_BLOCK_ROWS = 65536
+
+
+def item_text(item: dict) -> str:
+    """The text of an inventory item that is embedded"""
+    return " ".join(str(item.get(field) or "") for field in ("name", "description", "condition"))
+
+
+class HashingEmbedder:
+    """Feature hashing: every token is hashed to one of dim buckets, with a hashed sign
+    so that collisions cancel out on average instead of piling up"""
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    @staticmethod
+    def tokens(text: str) -> List[str]:
+        """Lowercased words without stop words, with plural s dropped ("jordans" -> "jordan")"""
+        words = []
+        for word in TOKEN_PATTERN.findall(text.lower()):
+            if word in STOP_WORDS:
+                continue
+            if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+                word = word[:-1]
+            words.append(word)
+        return words
+
+    def features(self, text: str) -> Counter:
+        words = self.tokens(text)
+        features = Counter()
+        for word in words:
+            features["w:" + word] += 1.0
+            padded = f"^{word}$"
+            for i in range(len(padded) - 2):
+                features["c:" + padded[i:i + 3]] += CHAR_NGRAM_WEIGHT
+        for first, second in zip(words, words[1:]):
+            features[f"b:{first}_{second}"] += 1.0
+        return features
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Sublinear term-frequency vectors, one row per text"""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self.features(text).items():
+                h = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if h & 0x80000000 else -1.0
+                weight = 1.0 + math.log(count) if count >= 1 else count
+                vectors[row, h % self.dim] += sign * weight
+        return vectors
+
+
+class InventoryVectorIndex:
+    def __init__(self, path: str = "inventory_vectors", dim: int = 512, initial_capacity: int = 1024):
+        """
+        path: prefix for the index files (.vectors is the memory-mapped matrix,
+              .ids the item id of each row, .meta.json the row count and IDF statistics)
+        """
+        self.path = path
+        self.embedder = HashingEmbedder(dim)
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+        meta = self._read_meta()
+        if meta is not None and meta["dim"] == dim:
+            self.capacity = meta["capacity"]
+            self.document_frequency = np.array(meta["document_frequency"], dtype=np.float64)
+            with open(path + ".ids", "r", encoding="utf-8") as f:
+                ids = f.read().splitlines()
+            # Rows past the recorded count were written by an interrupted add
+            self._ids = ids[:meta["count"]]
+            self._rows = {item_id: row for row, item_id in enumerate(self._ids)}
+            self._vectors = np.memmap(path + ".vectors", dtype=np.float16, mode="r+",
+                                      shape=(self.capacity, dim))
+            if len(ids) != len(self._ids):
+                self._rewrite_ids()
+        else:
+            self.capacity = initial_capacity
+            self.document_frequency = np.zeros(dim, dtype=np.float64)
+            self._vectors = np.memmap(path + ".vectors", dtype=np.float16, mode="w+",
+                                      shape=(self.capacity, dim))
+            self._rewrite_ids()
+            self._write_meta()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    #Files
+
+    def _read_meta(self):
+        try:
+            with open(self.path + ".meta.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self):
+        meta = {
+            "dim": self.embedder.dim,
+            "count": len(self._ids),
+            "capacity": self.capacity,
+            "document_frequency": self.document_frequency.tolist()
+        }
+        temporary = self.path + ".meta.json.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(temporary, self.path + ".meta.json")
+
+    def _rewrite_ids(self):
+        with open(self.path + ".ids", "w", encoding="utf-8") as f:
+            f.writelines(item_id + "\n" for item_id in self._ids)
+
+    def _grow(self, needed: int):
+        """Double the memory-mapped matrix until it holds needed rows"""
+        if needed <= self.capacity:
+            return
+        self._vectors.flush()
+        while self.capacity < needed:
+            self.capacity *= 2
+        del self._vectors
+        with open(self.path + ".vectors", "r+b") as f:
+            f.truncate(self.capacity * self.embedder.dim * np.dtype(np.float16).itemsize)
+        self._vectors = np.memmap(self.path + ".vectors", dtype=np.float16, mode="r+",
+                                  shape=(self.capacity, self.embedder.dim))
+
+    #Updating
+
+    def add(self, item_id: str, text: str):
+        self.add_many([(item_id, text)])
+
+    def add_many(self, items: Sequence[Tuple[str, str]]):
+        """Embed and store items; an id that is already indexed is replaced"""
+        # The last text wins when an id appears twice in one batch
+        items = list(dict(items).items())
+        if not items:
+            return
+        vectors = self.embedder.embed([text for _, text in items]).astype(np.float16)
+        with self._lock:
+            new_ids = []
+            rows = []
+            for item_id, _ in items:
+                row = self._rows.get(item_id)
+                if row is None:
+                    row = len(self._ids) + len(new_ids)
+                    new_ids.append(item_id)
+                else:
+                    self.document_frequency -= self._vectors[row] != 0
+                rows.append(row)
+            self._grow(len(self._ids) + len(new_ids))
+            self._vectors[rows] = vectors
+            self.document_frequency += (vectors != 0).sum(axis=0)
+            self._vectors.flush()
+
+            with open(self.path + ".ids", "a", encoding="utf-8") as f:
+                f.writelines(item_id + "\n" for item_id in new_ids)
+            for item_id in new_ids:
+                self._rows[item_id] = len(self._ids)
+                self._ids.append(item_id)
+            self._write_meta()
+
+    #Searching
+
+    def _idf(self) -> np.ndarray:
+        return (np.log((1.0 + len(self._ids)) / (1.0 + self.document_frequency)) + 1.0).astype(np.float32)
+
+    def search(self, queries: Sequence[str], top_k: int = 10) -> List[List[Tuple[str, float]]]:
+        """For each query, up to top_k (item id, cosine similarity) pairs, best first.
+        Items with no similarity to the query are left out."""
+        if top_k < 1:
+            raise ValueError("top_k must be at least 1")
+        with self._lock:
+            count = len(self._ids)
+            if count == 0:
+                return [[] for _ in queries]
+            idf = self._idf()
+            query_vectors = self.embedder.embed(queries) * idf
+            query_vectors /= np.maximum(np.linalg.norm(query_vectors, axis=1, keepdims=True), 1e-12)
+            k = min(top_k, count)
+
+            best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+            best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+            for start in range(0, count, SCORE_BLOCK_ROWS):
+                block = self._vectors[start:min(count, start + SCORE_BLOCK_ROWS)].astype(np.float32)
+                block *= idf
+                block /= np.maximum(np.linalg.norm(block, axis=1, keepdims=True), 1e-12)
+                scores = query_vectors @ block.T  # queries x rows
+                # Keep only the running top k per query
+                scores = np.concatenate([best_scores, scores], axis=1)
+                rows = np.concatenate([best_rows, np.broadcast_to(
+                    np.arange(start, start + block.shape[0]), (len(queries), block.shape[0]))], axis=1)
+                keep = np.argpartition(-scores, k - 1, axis=1)[:, :k] if scores.shape[1] > k else \
+                    np.broadcast_to(np.arange(scores.shape[1]), (len(queries), scores.shape[1]))
+                best_scores = np.take_along_axis(scores, keep, axis=1)
+                best_rows = np.take_along_axis(rows, keep, axis=1)
+
+            order = np.argsort(-best_scores, axis=1)
+            best_scores = np.take_along_axis(best_scores, order, axis=1)
+            best_rows = np.take_along_axis(best_rows, order, axis=1)
+            # A score of 0 or less shares nothing with the query; don't pad the top k with it
+            return [[(self._ids[row], float(score)) for row, score in zip(rows, scores) if score > 0]
+                    for rows, scores in zip(best_rows, best_scores)]
@@ -0,0 +1,308 @@
+#Storing the Inventory in SQLite
+"""The inventory tools used to keep inventory_db as a dict, and get_inventory put the
+whole inventory into the prompt. InventoryStore keeps it in SQLite instead:
+
+Indexes on name, condition, estimated_value and added_date (condition is paired with
+value and date, since it alone narrows a large inventory very little)
+save_items writes many items in one transaction
+query returns one filtered page at a time, with a cursor for the next page
+(keyset pagination, so page 1000 is as fast as page 1)
+Writes from many agent sessions are buffered and flushed by one writer thread in
+batches (write-behind); a read waits only for the writes buffered before it started,
+so readers aren't starved by a steady stream of new writes
+Items are validated before they are buffered. If a batch still can't be written, its
+items are retried one at a time and the ones that fail are reported by the next
+flush, query or count
+
+Usage:
+
+store = InventoryStore("inventory.sqlite")
+action_context = ActionContext({"inventory_db": store})"""
+
+import atexit
+import base64
+import json
+import math
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from collections import deque
+from typing import Dict, List, Optional
+
+ORDER_COLUMNS = {"added_date", "estimated_value", "name"}
+ITEM_COLUMNS = ("id", "name", "description", "condition", "estimated_value", "added_date")
+
+
+class InventoryStore:
+    def __init__(self,
+                 path: str = "inventory.sqlite",
+                 batch_size: int = 500,
+                 flush_interval: float = 0.05,
+                 max_pending: int = 5000):
+        """
+        path: SQLite file (WAL mode, so readers don't block the writer)
+        batch_size: flush as soon as this many writes are buffered
+        flush_interval: otherwise flush buffered writes after this many seconds
+        max_pending: save_items blocks while this many writes are buffered, which
+                     bounds memory and how long a read can wait for earlier writes
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[str, dict] = {}  # id -> item waiting to be written
+        self._condition = threading.Condition()
+        self._saved_seq = 0    # bumped by every save_items call
+        self._written_seq = 0  # every save up to this number is in the database
+        self._local = threading.local()
+        self._closed = False
+        # (first seq, last seq, error) for batches with items that couldn't be written
+        self._failures = deque(maxlen=100)
+
+        self._writer_db = sqlite3.connect(path, check_same_thread=False)
+        self._writer_db.execute("PRAGMA journal_mode=WAL")
+        self._writer_db.execute("PRAGMA synchronous=NORMAL")
+        self._writer_db.executescript("""
+            CREATE TABLE IF NOT EXISTS items (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                description TEXT,
+                condition TEXT,
+                estimated_value REAL,
+                added_date TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS items_name ON items (name COLLATE NOCASE, id);
+            CREATE INDEX IF NOT EXISTS items_condition_value ON items (condition, estimated_value, id);
+            CREATE INDEX IF NOT EXISTS items_condition_added ON items (condition, added_date, id);
+            CREATE INDEX IF NOT EXISTS items_value ON items (estimated_value, id);
+            CREATE INDEX IF NOT EXISTS items_added ON items (added_date, id);
+        """)
+        self._writer_db.commit()
+
+        self._writer = threading.Thread(target=self._write_behind, daemon=True,
+                                        name="inventory-writer")
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _db(self) -> sqlite3.Connection:
+        """One read connection per thread"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, check_same_thread=False)
+            db.row_factory = sqlite3.Row
+        return db
+
+    #Writing
+
+    @staticmethod
+    def new_item(name: str, description: str, condition: str, estimated_value: float,
+                 item_id: Optional[str] = None, added_date: Optional[str] = None) -> dict:
+        item = {
+            "id": item_id or str(uuid.uuid4()),
+            "name": name,
+            "description": description,
+            "condition": condition,
+            "estimated_value": estimated_value,
+            "added_date": added_date or datetime.now().isoformat()
+        }
+        InventoryStore.validate_item(item)
+        return item
+
+    @staticmethod
+    def validate_item(item: dict):
+        """Raise ValueError for an item the items table would reject"""
+        for column in ("id", "name", "added_date"):
+            if not isinstance(item.get(column), str) or not item[column]:
+                raise ValueError(f"item {column} must be a non-empty string")
+        for column in ("description", "condition"):
+            if item.get(column) is not None and not isinstance(item[column], str):
+                raise ValueError(f"item {column} must be a string")
+        value = item.get("estimated_value")
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                  or not math.isfinite(value)):
+            raise ValueError("item estimated_value must be a finite number")
+
+    def save_items(self, items: List[dict]) -> List[str]:
+        """Buffer items for the writer thread; returns their ids.
+        Raises ValueError, and buffers nothing, if any item is invalid."""
+        for item in items:
+            self.validate_item(item)
+        with self._condition:
+            while len(self._pending) >= self.max_pending and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                raise RuntimeError("InventoryStore is closed")
+            was_empty = not self._pending
+            for item in items:
+                self._pending[item["id"]] = item
+            self._saved_seq += 1
+            if was_empty or len(self._pending) >= self.batch_size:
+                self._condition.notify_all()
+        return [item["id"] for item in items]
+
+    def save(self, item: dict) -> str:
+        return self.save_items([item])[0]
+
+    def _write_behind(self):
+        while True:
+            with self._condition:
+                if not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending and self._closed:
+                    return
+                if len(self._pending) < self.batch_size and not self._closed:
+                    # Give other sessions a moment to add to this batch
+                    self._condition.wait(self.flush_interval)
+                # Everything saved so far is pending or already written, so this
+                # batch completes every save up to batch_seq
+                batch = list(self._pending.values())
+                first_seq = self._written_seq + 1
+                batch_seq = self._saved_seq
+            try:
+                error = self._write(batch)
+            except Exception as e:
+                # Keep the writer alive; the waiting callers get the error instead
+                error = e
+            with self._condition:
+                for item in batch:
+                    # Keep items that were saved again while this batch was written
+                    if self._pending.get(item["id"]) is item:
+                        del self._pending[item["id"]]
+                if error is not None:
+                    self._failures.append((first_seq, batch_seq, error))
+                self._written_seq = batch_seq
+                self._condition.notify_all()
+
+    def _write(self, batch: List[dict]) -> Optional[Exception]:
+        """Write the batch in one transaction. If that fails, write the items one at a
+        time so only the bad ones are lost; returns an error describing those."""
+        sql = ("INSERT OR REPLACE INTO items (id, name, description, condition, estimated_value, added_date) "
+               "VALUES (?, ?, ?, ?, ?, ?)")
+        rows = [tuple(item.get(column) for column in ITEM_COLUMNS) for item in batch]
+        try:
+            with self._writer_db:
+                self._writer_db.executemany(sql, rows)
+            return None
+        except sqlite3.Error:
+            pass
+        failed = []
+        for row in rows:
+            try:
+                with self._writer_db:
+                    self._writer_db.execute(sql, row)
+            except sqlite3.Error as e:
+                failed.append(f"{row[0]}: {e}")
+        if failed:
+            return RuntimeError(f"{len(failed)} item(s) could not be written: " + "; ".join(failed[:5]))
+        return None
+
+    def flush(self):
+        """Block until every write buffered before this call is in the database.
+        Writes saved while waiting don't extend the wait. Raises RuntimeError if some
+        of those writes failed, or if the writer thread has stopped."""
+        with self._condition:
+            start, target = self._written_seq, self._saved_seq
+            self._condition.notify_all()
+            while self._written_seq < target:
+                if not self._writer.is_alive():
+                    raise RuntimeError("InventoryStore writer thread has stopped")
+                self._condition.wait(0.5)
+            for first_seq, last_seq, error in self._failures:
+                if first_seq <= target and last_seq > start:
+                    raise RuntimeError(f"Saving to {self.path} failed: {error}") from error
+
+    def close(self):
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._writer.join()
+        self._writer_db.execute("PRAGMA optimize")
+        self._writer_db.close()
+
+    #Reading
+
+    def get(self, item_id: str) -> Optional[dict]:
+        with self._condition:
+            item = self._pending.get(item_id)
+        if item is not None:
+            return dict(item)
+        row = self._db().execute("SELECT * FROM items WHERE id = ?", (item_id,)).fetchone()
+        return dict(row) if row else None
+
+    def query(self,
+              name_prefix: Optional[str] = None,
+              condition: Optional[str] = None,
+              min_value: Optional[float] = None,
+              max_value: Optional[float] = None,
+              added_after: Optional[str] = None,
+              added_before: Optional[str] = None,
+              order_by: str = "added_date",
+              descending: bool = False,
+              limit: int = 20,
+              cursor: Optional[str] = None) -> Dict:
+        """One page of matching items, plus next_cursor when there are more.
+        Items without an estimated_value come first in ascending order, last in descending."""
+        if order_by not in ORDER_COLUMNS:
+            raise ValueError(f"order_by must be one of {sorted(ORDER_COLUMNS)}")
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.flush()
+
+        where, params = [], []
+        if name_prefix:
+            # LIKE with a literal prefix can use the NOCASE name index
+            escaped = name_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where.append("name LIKE ? ESCAPE '\\'")
+            params.append(escaped + "%")
+        if condition:
+            where.append("condition = ?")
+            params.append(condition)
+        if min_value is not None:
+            where.append("estimated_value >= ?")
+            params.append(min_value)
+        if max_value is not None:
+            where.append("estimated_value <= ?")
+            params.append(max_value)
+        if added_after:
+            where.append("added_date >= ?")
+            params.append(added_after)
+        if added_before:
+            where.append("added_date < ?")
+            params.append(added_before)
+
+        collate = " COLLATE NOCASE" if order_by == "name" else ""
+        direction = "DESC" if descending else "ASC"
+        if cursor:
+            last_value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            after = "<" if descending else ">"
+            # SQLite sorts NULL before every value, and a comparison with NULL is never
+            # true, so NULLs (only estimated_value can be NULL) get explicit branches
+            if last_value is None:
+                where.append(f"({order_by} IS NULL AND id {after} ?)" if descending else
+                             f"({order_by} IS NULL AND id {after} ? OR {order_by} IS NOT NULL)")
+                params.append(last_id)
+            else:
+                where.append(f"(({order_by}{collate}, id) {after} (?, ?) OR {order_by} IS NULL)"
+                             if descending else f"({order_by}{collate}, id) {after} (?, ?)")
+                params.extend([last_value, last_id])
+
+        sql = "SELECT * FROM items"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order_by}{collate} {direction}, id {direction} LIMIT ?"
+        rows = self._db().execute(sql, params + [limit + 1]).fetchall()
+
+        items = [dict(row) for row in rows[:limit]]
+        page = {"items": items}
+        if len(rows) > limit:
+            last = items[-1]
+            page["next_cursor"] = base64.urlsafe_b64encode(
+                json.dumps([last[order_by], last["id"]]).encode()).decode()
+        return page
+
+    def count(self) -> int:
+        self.flush()
+        return self._db().execute("SELECT COUNT(*) FROM items").fetchone()[0]
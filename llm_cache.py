@@ -0,0 +1,195 @@
+#Caching LLM Responses
+"""Agents that run over unchanged projects send the same prompts again and again.
+This cache sits in front of generate_response and returns the stored answer for a
+prompt it has already seen. Entries are content addressed: the key is a hash of
+the model, messages, tools and max_tokens, so any change to the prompt is a miss.
+
+There are two tiers:
+
+An in-process LRU for the current run
+An optional SQLite file shared across runs
+
+Usage (opt-in per agent):
+
+cache = LLMResponseCache(path="llm_cache.sqlite")
+agent = Agent(goals, agent_language, action_registry,
+              cache.wrap(generate_response), environment)
+print(cache.stats())"""
+
+import hashlib
+import inspect
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+
+class LLMResponseCache:
+    def __init__(self,
+                 path: Optional[str] = None,
+                 max_entries: int = 1024,
+                 max_disk_entries: int = 100_000,
+                 ttl_seconds: Optional[float] = 7 * 24 * 3600):
+        """
+        path: SQLite file for the on-disk tier, or None for memory only
+        max_entries / max_disk_entries: size limits for each tier
+        ttl_seconds: entries older than this are treated as misses (None = never expire)
+        """
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()  # key -> (response, created_at)
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict], tools: List[Dict], max_tokens: int) -> str:
+        """Hash the parts of a request that determine the response"""
+        payload = json.dumps(
+            {"model": model, "messages": messages, "tools": tools, "max_tokens": max_tokens},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    return response
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    response, created_at = row
+                    if not self._expired(created_at, now):
+                        self._db.execute(
+                            "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                        )
+                        self._db.commit()
+                        self._remember(key, response, created_at)
+                        self.hits_disk += 1
+                        return response
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, response, now, now)
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def _remember(self, key: str, response: str, created_at: float):
+        """Insert into the LRU tier; caller holds the lock"""
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float):
+        """Drop expired rows, then the least recently used rows over the size limit"""
+        if self.ttl_seconds is not None:
+            self._db.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+        (count,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_disk_entries:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_disk_entries,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory)
+        }
+
+    def wrap(self,
+             generate_response: Callable,
+             model: str = "openai/gpt-4o",
+             max_tokens: int = 1024) -> Callable:
+        """Return a drop-in replacement for generate_response (sync or async) that
+        consults the cache first. model and max_tokens must match what the wrapped
+        function sends, since they are part of the key."""
+
+        def key_for(prompt) -> str:
+            return self.make_key(model, prompt.messages, prompt.tools, max_tokens)
+
+        if inspect.iscoroutinefunction(generate_response):
+            @wraps(generate_response)
+            async def cached_agenerate_response(prompt) -> str:
+                key = key_for(prompt)
+                response = self.get(key)
+                if response is None:
+                    response = await generate_response(prompt)
+                    if response is not None:
+                        self.put(key, response)
+                return response
+
+            return cached_agenerate_response
+
+        @wraps(generate_response)
+        def cached_generate_response(prompt) -> str:
+            key = key_for(prompt)
+            response = self.get(key)
+            if response is None:
+                response = generate_response(prompt)
+                if response is not None:
+                    self.put(key, response)
+            return response
+
+        return cached_generate_response
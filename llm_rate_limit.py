@@ -0,0 +1,297 @@
+#Rate Limiting and Retrying LLM Calls
+"""Under load the provider answers with 429s. Instead of letting those crash the agent
+loop, every completion call goes through a per-model limiter that:
+
+Keeps both requests/min and tokens/min under the configured limits (token buckets)
+Waits as long as a Retry-After header asks
+Retries transient errors with jittered exponential backoff
+Adjusts how many requests are in flight (AIMD): +1 slot per window of successes,
+halved on every rate-limit error. The bucket rates back off and recover the same way
+Models that were never configured have no request or token limits; they start at
+full concurrency and only slow down once the provider answers with a 429
+
+Usage:
+
+from litellm import completion
+completion = rate_limited(completion)
+configure_model("openai/gpt-4o", requests_per_minute=500, tokens_per_minute=30000)"""
+
+import asyncio
+import inspect
+import random
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {"RateLimitError", "APIConnectionError", "Timeout", "APITimeoutError",
+                    "ServiceUnavailableError", "InternalServerError"}
+
+
+class TokenBucket:
+    """Refills continuously at capacity per minute, or slower while backed off"""
+
+    MIN_RATE_FRACTION = 0.1   # backoff never goes below this share of the configured rate
+    RECOVER_FRACTION = 0.02   # share of the configured rate won back per success
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.max_rate = per_minute / 60.0
+        self.rate = self.max_rate
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available (0 if it is available now)"""
+        self._refill(now)
+        # A request larger than the bucket only has to wait for a full bucket
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        # The bucket can be emptied but never goes into debt, so one oversized
+        # request can't stall the ones after it for minutes
+        self.level = min(self.capacity, max(0.0, self.level - amount))
+
+    def back_off(self, now: float):
+        self._refill(now)
+        self.rate = max(self.max_rate * self.MIN_RATE_FRACTION, self.rate / 2)
+
+    def recover(self, now: float):
+        self._refill(now)
+        self.rate = min(self.max_rate, self.rate + self.max_rate * self.RECOVER_FRACTION)
+
+
+class ModelRateLimiter:
+    def __init__(self,
+                 requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None,
+                 max_concurrency: int = 64,
+                 min_concurrency: int = 1,
+                 initial_concurrency: Optional[int] = None):
+        """
+        requests_per_minute, tokens_per_minute: the provider's limits for this model
+                                                (None means no limit)
+        initial_concurrency: requests allowed in flight at first (None starts at max_concurrency)
+        """
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.buckets = [bucket for bucket in (self.requests, self.tokens) if bucket is not None]
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency = float(initial_concurrency or max_concurrency)
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.rate_limited = 0
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, estimated_tokens: int) -> float:
+        """Take a slot and charge the buckets, or return how long to wait first"""
+        with self._lock:
+            now = time.monotonic()
+            wait = self.cooldown_until - now
+            if self.requests is not None:
+                wait = max(wait, self.requests.wait_time(1, now))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.wait_time(estimated_tokens, now))
+            if wait <= 0 and self.in_flight >= int(self.concurrency):
+                wait = 0.05
+            if wait > 0:
+                return wait
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(estimated_tokens)
+            self.in_flight += 1
+            return 0.0
+
+    def acquire(self, estimated_tokens: int):
+        while True:
+            wait = self.try_acquire(estimated_tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def aacquire(self, estimated_tokens: int):
+        while True:
+            wait = self.try_acquire(estimated_tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def release(self, estimated_tokens: int, used_tokens: Optional[int] = None,
+                rate_limited: bool = False, retry_after: Optional[float] = None,
+                failed: bool = False):
+        with self._lock:
+            now = time.monotonic()
+            self.in_flight -= 1
+            if used_tokens is not None and self.tokens is not None:
+                # Settle the estimate against what the provider actually counted
+                self.tokens.take(used_tokens - estimated_tokens)
+            if rate_limited:
+                self.rate_limited += 1
+                self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+                for bucket in self.buckets:
+                    bucket.back_off(now)
+                if retry_after:
+                    self.cooldown_until = max(self.cooldown_until, now + retry_after)
+            elif not failed:
+                self.completed += 1
+                self.concurrency = min(self.max_concurrency,
+                                       self.concurrency + 1 / self.concurrency)
+                for bucket in self.buckets:
+                    bucket.recover(now)
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": int(self.concurrency),
+            "in_flight": self.in_flight,
+            "requests_per_minute": self.requests.rate * 60 if self.requests else None,
+            "tokens_per_minute": self.tokens.rate * 60 if self.tokens else None,
+            "completed": self.completed,
+            "rate_limited": self.rate_limited
+        }
+
+
+_limiters: Dict[str, ModelRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def configure_model(model: str, **limits) -> ModelRateLimiter:
+    """Set the limits for one model (see ModelRateLimiter for the options)"""
+    with _limiters_lock:
+        _limiters[model] = ModelRateLimiter(**limits)
+        return _limiters[model]
+
+
+def get_limiter(model: str) -> ModelRateLimiter:
+    """The model's limiter; an unconfigured model gets one with no rate limits"""
+    with _limiters_lock:
+        if model not in _limiters:
+            _limiters[model] = ModelRateLimiter()
+        return _limiters[model]
+
+
+def estimate_request_tokens(kwargs: dict) -> int:
+    """Prompt tokens (~4 characters per token) plus the completion budget"""
+    chars = 0
+    for message in kwargs.get("messages", []):
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = " ".join(str(part.get("text", "")) for part in content)
+        chars += len(content)
+    return chars // 4 + (kwargs.get("max_tokens") or 1024)
+
+
+def call_arguments(signature: Optional[inspect.Signature], args: tuple, kwargs: dict) -> dict:
+    """The call's arguments by name, so model and messages are found even when
+    they are passed positionally (completion("openai/gpt-4o", messages))"""
+    if not args:
+        return kwargs
+    if signature is not None:
+        try:
+            arguments = dict(signature.bind_partial(*args, **kwargs).arguments)
+        except TypeError:
+            pass
+        else:
+            for name, parameter in signature.parameters.items():
+                if parameter.kind is parameter.VAR_KEYWORD:
+                    arguments.update(arguments.pop(name, {}))
+                elif parameter.kind is parameter.VAR_POSITIONAL:
+                    arguments.pop(name, None)
+            return arguments
+    # litellm's completion takes model and messages first
+    return {**dict(zip(("model", "messages"), args)), **kwargs}
+
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    return status in RETRYABLE_STATUS or type(error).__name__ in RETRYABLE_ERRORS
+
+
+def is_rate_limit(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Read Retry-After (seconds) from the error or its HTTP response, if present"""
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def used_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None) if usage is not None else None
+
+
+def rate_limited(completion: Callable,
+                 max_retries: int = 6,
+                 base_delay: float = 1.0,
+                 max_delay: float = 60.0) -> Callable:
+    """Wrap litellm's completion or acompletion with limiting, retries and backoff"""
+    try:
+        signature = inspect.signature(completion)
+    except (TypeError, ValueError):
+        signature = None
+
+    if inspect.iscoroutinefunction(completion):
+        @wraps(completion)
+        async def rate_limited_acompletion(*args, **kwargs):
+            arguments = call_arguments(signature, args, kwargs)
+            limiter = get_limiter(arguments.get("model"))
+            estimate = estimate_request_tokens(arguments)
+            for attempt in range(max_retries + 1):
+                await limiter.aacquire(estimate)
+                try:
+                    response = await completion(*args, **kwargs)
+                except Exception as e:
+                    retry_after = get_retry_after(e)
+                    limiter.release(estimate, rate_limited=is_rate_limit(e),
+                                    retry_after=retry_after, failed=True)
+                    if not is_retryable(e) or attempt == max_retries:
+                        raise
+                    await asyncio.sleep(retry_after or backoff_delay(attempt, base_delay, max_delay))
+                    continue
+                limiter.release(estimate, used_tokens(response))
+                return response
+
+        return rate_limited_acompletion
+
+    @wraps(completion)
+    def rate_limited_completion(*args, **kwargs):
+        arguments = call_arguments(signature, args, kwargs)
+        limiter = get_limiter(arguments.get("model"))
+        estimate = estimate_request_tokens(arguments)
+        for attempt in range(max_retries + 1):
+            limiter.acquire(estimate)
+            try:
+                response = completion(*args, **kwargs)
+            except Exception as e:
+                retry_after = get_retry_after(e)
+                limiter.release(estimate, rate_limited=is_rate_limit(e),
+                                retry_after=retry_after, failed=True)
+                if not is_retryable(e) or attempt == max_retries:
+                    raise
+                time.sleep(retry_after or backoff_delay(attempt, base_delay, max_delay))
+                continue
+            limiter.release(estimate, used_tokens(response))
+            return response
+
+    return rate_limited_completion
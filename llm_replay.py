@@ -0,0 +1,281 @@
+#Recording and Replaying LLM Calls
+"""Running Agent.run, develop_custom_function or the filehandling flow normally needs
+a live API key, and every run is slightly different. This backend records real
+completion calls to a cassette file once, then replays them deterministically:
+
+No network or API key during replay
+The same responses in the same order every run
+Optional injected latency to mimic (or scale) the real round trips
+Requests are matched with volatile values (timestamps) blanked out, so a multi-step
+Agent.run, whose prompts carry each tool result's timestamp, replays step after step
+
+That makes it possible to benchmark and profile the agent loop itself.
+
+Usage:
+
+backend = ReplayBackend("cassettes/readme.jsonl.gz", mode="record")   # once, online
+backend = ReplayBackend("cassettes/readme.jsonl.gz", mode="replay")   # afterwards, offline
+backend.install()            # before `from litellm import completion` runs
+backend.patch(Readme_agent)  # for modules that already imported completion"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, Optional
+
+VOLATILE_FIELDS = {"timestamp"}  # dict keys whose values are left out of request keys
+# Times as they appear inside prompt text, e.g. a JSON-serialized tool result
+VOLATILE_TEXT = re.compile(
+    r'("timestamp"\s*:\s*)("[^"]*"|[\d.]+)'
+    r"|\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?")
+
+
+def _normalize(value: Any) -> Any:
+    """The request with volatile values replaced, for keying"""
+    if isinstance(value, dict):
+        return {k: None if k in VOLATILE_FIELDS else _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        return VOLATILE_TEXT.sub(lambda m: m.group(1) + '""' if m.group(1) else "<time>", value)
+    return value
+
+
+class ReplayMissError(KeyError):
+    """Raised in replay mode when a request was never recorded"""
+
+
+class _Record:
+    """Attribute-style view of a recorded response (response.choices[0].message...)"""
+
+    def __init__(self, data: Dict):
+        self._data = data
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return _wrap(self._data[name])
+        except KeyError:
+            return None
+
+    def __getitem__(self, name: str) -> Any:
+        return _wrap(self._data[name])
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return _wrap(self._data.get(name, default))
+
+    def to_dict(self) -> Dict:
+        return self._data
+
+
+def _wrap(value: Any) -> Any:
+    if isinstance(value, dict):
+        return _Record(value)
+    if isinstance(value, list):
+        return [_wrap(v) for v in value]
+    return value
+
+
+def _to_dict(response: Any) -> Dict:
+    """Serialize a litellm response object"""
+    for method in ("model_dump", "to_dict", "dict"):
+        if hasattr(response, method):
+            return getattr(response, method)()
+    return json.loads(json.dumps(response, default=lambda o: o.__dict__))
+
+
+class ReplayBackend:
+    def __init__(self,
+                 path: str,
+                 mode: str = "replay",
+                 latency: Optional[float] = None,
+                 use_recorded_latency: bool = False,
+                 latency_scale: float = 1.0,
+                 store_requests: bool = False):
+        """
+        mode: "record" (always call the real API), "replay" (never call it) or
+              "record_new" (replay what exists, record the rest)
+        latency: fixed delay in seconds added to every replayed call
+        use_recorded_latency: sleep for the recorded round-trip time instead,
+                              multiplied by latency_scale
+        store_requests: keep full request bodies in the cassette (off for a compact file)
+        """
+        if mode not in ("record", "replay", "record_new"):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.use_recorded_latency = use_recorded_latency
+        self.latency_scale = latency_scale
+        self.store_requests = store_requests
+        self._interactions = defaultdict(deque)  # key -> recorded interactions, in order
+        self._lock = threading.Lock()
+        self._real_completion = None
+        self._real_acompletion = None
+        self._truncate = mode == "record"  # re-recording replaces the cassette
+        self.loaded = 0
+        self.replayed = 0
+        self.recorded = 0
+
+        if mode != "record" and os.path.exists(path):
+            self.load()
+
+    #Cassette file
+
+    def _open(self, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def load(self):
+        with self._open("r") as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self._interactions[interaction["key"]].append(interaction)
+                    self.loaded += 1
+
+    def _append(self, interaction: Dict):
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Appending keeps recording crash-safe; gzip supports multi-member files
+            with self._open("w" if self._truncate else "a") as f:
+                f.write(json.dumps(interaction, separators=(",", ":")) + "\n")
+            self._truncate = False
+            self.recorded += 1
+
+    @staticmethod
+    def make_key(kwargs: Dict) -> str:
+        """Hash the request; stream is excluded so streamed and plain calls share recordings,
+        and volatile values are blanked so they don't change the key"""
+        request = _normalize({k: v for k, v in kwargs.items() if k not in ("stream", "api_key")})
+        payload = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _next_recording(self, key: str) -> Optional[Dict]:
+        """Recordings for the same request are replayed in order; the last one repeats"""
+        with self._lock:
+            queue = self._interactions.get(key)
+            if not queue:
+                return None
+            interaction = queue.popleft() if len(queue) > 1 else queue[0]
+            self.replayed += 1
+            return interaction
+
+    def _delay(self, interaction: Dict) -> float:
+        if self.use_recorded_latency:
+            return interaction.get("latency", 0.0) * self.latency_scale
+        return self.latency or 0.0
+
+    def _interaction(self, key: str, kwargs: Dict, response: Dict, started: float) -> Dict:
+        interaction = {
+            "key": key,
+            "model": kwargs.get("model"),
+            "latency": round(time.time() - started, 4),
+            "response": response
+        }
+        if self.store_requests:
+            interaction["request"] = {k: v for k, v in kwargs.items() if k != "api_key"}
+        return interaction
+
+    #completion / acompletion replacements
+
+    def completion(self, **kwargs) -> Any:
+        key = self.make_key(kwargs)
+        if self.mode != "record":
+            interaction = self._next_recording(key)
+            if interaction is not None:
+                time.sleep(self._delay(interaction))
+                return self._replay(interaction, kwargs.get("stream", False))
+            if self.mode == "replay":
+                raise ReplayMissError(f"No recording for model={kwargs.get('model')} "
+                                      f"request {key[:12]} in {self.path}")
+
+        started = time.time()
+        response = self._real()(**kwargs)
+        if kwargs.get("stream"):
+            return self._record_stream(key, kwargs, response, started)
+        self._append(self._interaction(key, kwargs, _to_dict(response), started))
+        return response
+
+    async def acompletion(self, **kwargs) -> Any:
+        key = self.make_key(kwargs)
+        if self.mode != "record":
+            interaction = self._next_recording(key)
+            if interaction is not None:
+                await asyncio.sleep(self._delay(interaction))
+                return self._replay(interaction, False)
+            if self.mode == "replay":
+                raise ReplayMissError(f"No recording for model={kwargs.get('model')} "
+                                      f"request {key[:12]} in {self.path}")
+
+        started = time.time()
+        response = await self._real(asynchronous=True)(**kwargs)
+        self._append(self._interaction(key, kwargs, _to_dict(response), started))
+        return response
+
+    def _replay(self, interaction: Dict, stream: bool) -> Any:
+        response = interaction["response"]
+        if not stream:
+            return _wrap(response)
+        # Streamed recordings are stored as the joined text; replay them as one chunk
+        content = response.get("content")
+        if content is None:
+            content = response["choices"][0]["message"]["content"] or ""
+        return iter([_wrap({"choices": [{"delta": {"content": content}}]})])
+
+    def _record_stream(self, key: str, kwargs: Dict, stream: Any, started: float):
+        """Pass chunks through and record the text once the stream ends or is closed early"""
+        parts = []
+        try:
+            for chunk in stream:
+                parts.append(chunk.choices[0].delta.content or "")
+                yield chunk
+        finally:
+            self._append(self._interaction(key, kwargs, {"content": "".join(parts)}, started))
+
+    def _real(self, asynchronous: bool = False):
+        if asynchronous:
+            if self._real_acompletion is None:
+                import litellm
+                self._real_acompletion = litellm.acompletion
+            return self._real_acompletion
+        if self._real_completion is None:
+            import litellm
+            self._real_completion = litellm.completion
+        return self._real_completion
+
+    #Plugging the backend in
+
+    def install(self):
+        """Route litellm.completion/acompletion through this backend. Modules that run
+        `from litellm import completion` afterwards pick up the backend."""
+        import litellm
+        self._real_completion = self._real_completion or litellm.completion
+        self._real_acompletion = self._real_acompletion or litellm.acompletion
+        litellm.completion = self.completion
+        litellm.acompletion = self.acompletion
+
+    def patch(self, *modules):
+        """Swap the completion names in modules that already imported them"""
+        for module in modules:
+            if hasattr(module, "completion"):
+                self._real_completion = self._real_completion or module.completion
+                module.completion = self.completion
+            if hasattr(module, "acompletion"):
+                self._real_acompletion = self._real_acompletion or module.acompletion
+                module.acompletion = self.acompletion
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "recorded": self.recorded,
+            "replayed": self.replayed
+        }
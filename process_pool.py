@@ -0,0 +1,124 @@
+#Running Actions in Warm Worker Processes
+"""WarmProcessPool keeps a few Python processes started, so an action with
+executor="process" doesn't pay for interpreter startup, and a call that hangs can be
+killed without taking the agent down with it.
+
+Workers are started with forkserver (or spawn where it isn't available): the agent
+runs thread pools, and forking a threaded process can copy locks another thread
+holds. A started worker imports this module to find its loop, so it must stay free
+of import-time side effects, and so must any module defining a function sent to it
+
+Usage:
+
+pool = WarmProcessPool(size=2)
+pool.call(count_lines, {"path": "README.md"}, timeout=10)
+pool.shutdown()"""
+
+import multiprocessing
+import queue
+import threading
+import traceback
+from typing import Any, Callable
+
+
+class ActionTimeoutError(TimeoutError):
+    pass
+
+
+def _process_worker_main(conn):
+    """Loop run by each warm worker process: call functions sent over the pipe"""
+    while True:
+        message = conn.recv()
+        if message is None:
+            return
+        function, args = message
+        try:
+            conn.send((True, function(**args)))
+        except Exception as e:
+            conn.send((False, f"{e}\n{traceback.format_exc()}"))
+
+
+class _ProcessWorker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_process_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def call(self, function: Callable, args: dict, timeout: float = None) -> Any:
+        self.conn.send((function, args))
+        if not self.conn.poll(timeout):
+            raise ActionTimeoutError(f"timed out after {timeout}s")
+        ok, value = self.conn.recv()
+        if not ok:
+            raise RuntimeError(value)
+        return value
+
+    def is_alive(self) -> bool:
+        return not self.conn.closed and self.process.is_alive()
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+def default_process_context():
+    """forkserver, or spawn where it isn't available"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class WarmProcessPool:
+    """A fixed set of started worker processes. A worker that times out or dies is
+    killed and replaced, so the pool stays warm. If a replacement can't be started,
+    the next call that needs a worker tries again."""
+
+    def __init__(self, size: int = 2, context=None):
+        self.context = context or default_process_context()
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._missing = 0  # workers lost and not yet replaced
+        for _ in range(size):
+            self._idle.put(_ProcessWorker(self.context))
+        self.recycled = 0
+
+    def _take(self) -> _ProcessWorker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            replace = self._missing > 0
+            if replace:
+                self._missing -= 1
+        if not replace:
+            return self._idle.get()
+        try:
+            return _ProcessWorker(self.context)
+        except BaseException:
+            with self._lock:
+                self._missing += 1
+            raise
+
+    def call(self, function: Callable, args: dict, timeout: float = None) -> Any:
+        worker = self._take()
+        try:
+            return worker.call(function, args, timeout)
+        except (ActionTimeoutError, EOFError, OSError):
+            # The worker is stuck or dead; never hand it out again
+            worker.kill()
+            self.recycled += 1
+            worker = _ProcessWorker(self.context)
+            raise
+        finally:
+            if worker.is_alive():
+                self._idle.put(worker)
+            else:
+                worker.kill()
+                with self._lock:
+                    self._missing += 1
+
+    def shutdown(self):
+        while not self._idle.empty():
+            self._idle.get().kill()
@@ -0,0 +1,337 @@
+#Indexing the Project for Fast Lookups
+"""The README and file explorer agents used to rediscover the repository on every
+run with os.listdir and read_file. ProjectIndex keeps a trigram index of the working
+tree instead:
+
+Every text file is broken into the set of 3-byte sequences (trigrams) it contains
+A query is looked up by intersecting the file sets of its trigrams, and only those
+candidate files are opened to confirm the match and report line numbers
+The index is stored in SQLite and refreshed incrementally: only files whose mtime or
+size changed since the last run are re-read
+Refreshing (a walk and a stat of every file) stays off the query path: once the index
+is older than max_age_seconds, find() starts a refresh in the background and answers
+from the index as it is. Candidates are always confirmed against the files on disk,
+so a stale index can miss a very recent edit but never report a match that isn't there
+
+Usage:
+
+index = ProjectIndex(".", path=".project_index.sqlite")
+index.refresh()
+print(index.find("generate_response"))
+print(index.stats())"""
+
+import multiprocessing
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from file_tools import BINARY_SNIFF_BYTES, GitIgnore, search_file, walk_files
+
+MAX_INDEXED_FILE_BYTES = 4 * 1024 * 1024
+PARALLEL_BUILD_THRESHOLD = 256  # changed files before trigram extraction moves to worker processes
+POSTING_CACHE_SIZE = 4096
+ENOUGH_CANDIDATES = 16        # stop intersecting once this few files remain; verification filters the rest
+
+
+def file_trigrams(data: bytes) -> Set[int]:
+    """Lowercased trigrams of data, each packed into an int"""
+    data = data.lower()
+    return {a << 16 | b << 8 | c for a, b, c in set(zip(data, data[1:], data[2:]))}
+
+
+def query_trigrams(query: str) -> Set[int]:
+    return file_trigrams(query.encode("utf-8"))
+
+
+def read_trigrams(full_path: str) -> Optional[bytes]:
+    """Packed trigrams of one file (empty for binary or oversized files, None if unreadable)"""
+    try:
+        with open(full_path, "rb") as f:
+            data = f.read(MAX_INDEXED_FILE_BYTES + 1)
+    except OSError:
+        return None
+    if len(data) > MAX_INDEXED_FILE_BYTES or b"\x00" in data[:BINARY_SNIFF_BYTES]:
+        return b""
+    return array("i", sorted(file_trigrams(data))).tobytes()
+
+
+class ProjectIndex:
+    def __init__(self, root: str = ".", path: Optional[str] = ".project_index.sqlite",
+                 max_age_seconds: float = 2.0):
+        """
+        path: SQLite file the index is kept in between runs (None = memory only)
+        max_age_seconds: find() starts a background refresh once the last refresh is
+                         older than this (the first find() in a process waits for one)
+        """
+        self.root = root
+        self.max_age_seconds = max_age_seconds
+        self.path = path
+        # The index's own database files live in the tree; never index them
+        self._own_files = ({os.path.abspath(path) + suffix for suffix in ("", "-wal", "-shm", "-journal")}
+                           if path else set())
+        self._lock = threading.RLock()            # guards the database and the maps below
+        self._refresh_lock = threading.Lock()     # one refresh at a time
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._files: Dict[int, str] = {}          # file id -> path relative to root
+        self._ids: Dict[str, int] = {}            # path -> file id
+        self._versions: Dict[int, tuple] = {}     # file id -> (mtime_ns, size)
+        self._next_id = 1
+        self._posting_cache = OrderedDict()     # trigram -> decoded file ids (LRU)
+        self.refreshed_at = 0.0
+        self.last_refresh = {}
+
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, "
+            "mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, trigrams BLOB NOT NULL)"
+        )
+        # Posting lists: sorted file ids per trigram, read on demand by queries
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "trigram INTEGER PRIMARY KEY, count INTEGER NOT NULL, files BLOB NOT NULL)"
+        )
+        self._db.commit()
+
+        started = time.perf_counter()
+        for file_id, rel_path, mtime_ns, size in self._db.execute(
+                "SELECT id, path, mtime_ns, size FROM files"):
+            self._files[file_id] = rel_path
+            self._ids[rel_path] = file_id
+            self._versions[file_id] = (mtime_ns, size)
+            self._next_id = max(self._next_id, file_id + 1)
+        self.load_seconds = time.perf_counter() - started
+
+    def _stored_trigrams(self, file_id: int) -> Iterable[int]:
+        row = self._db.execute("SELECT trigrams FROM files WHERE id = ?", (file_id,)).fetchone()
+        return array("i", row[0]) if row else ()
+
+    def _posting(self, trigram: int) -> Set[int]:
+        files = self._posting_cache.get(trigram)
+        if files is not None:
+            self._posting_cache.move_to_end(trigram)
+            return files
+        row = self._db.execute("SELECT files FROM postings WHERE trigram = ?", (trigram,)).fetchone()
+        files = frozenset(array("i", row[0])) if row else frozenset()
+        self._posting_cache[trigram] = files
+        if len(self._posting_cache) > POSTING_CACHE_SIZE:
+            self._posting_cache.popitem(last=False)
+        return files
+
+    def _scan(self) -> Tuple[List[Tuple[str, tuple]], Set[str]]:
+        """Walk the tree; return the new or changed files and every path seen"""
+        changed, seen = [], set()
+        for rel_path in walk_files(self.root, "*", GitIgnore(self.root)):
+            full_path = os.path.join(self.root, rel_path)
+            if os.path.abspath(full_path) in self._own_files:
+                continue
+            try:
+                stat = os.stat(full_path)
+            except OSError:
+                continue
+            seen.add(rel_path)
+            version = (stat.st_mtime_ns, stat.st_size)
+            file_id = self._ids.get(rel_path)
+            if file_id is None or self._versions[file_id] != version:
+                changed.append((rel_path, version))
+        return changed, seen
+
+    def _extract(self, changed: List[Tuple[str, tuple]]) -> Iterable[Optional[bytes]]:
+        full_paths = [os.path.join(self.root, rel_path) for rel_path, _ in changed]
+        if len(full_paths) < PARALLEL_BUILD_THRESHOLD or (os.cpu_count() or 1) == 1:
+            return map(read_trigrams, full_paths)
+        # Not fork: the agent process already runs threads whose locks a fork would copy
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        with ProcessPoolExecutor(mp_context=context) as executor:
+            return list(executor.map(read_trigrams, full_paths, chunksize=32))
+
+    def refresh(self) -> Dict:
+        """Bring the index up to date with the working tree; returns what changed.
+        Walking the tree and reading changed files happen without holding the query
+        lock, so find() keeps answering while a refresh runs."""
+        with self._refresh_lock:
+            started = time.perf_counter()
+            # Only a refresh changes the maps _scan reads, and only one runs at a time
+            changed, seen = self._scan()
+            extracted = list(self._extract(changed))
+            with self._lock:
+                self._apply(changed, extracted, seen, started)
+            return self.last_refresh
+
+    def _apply(self, changed: List[Tuple[str, tuple]], extracted: List[Optional[bytes]],
+               seen: Set[str], started: float):
+        # trigram -> (file ids to add, file ids to remove), applied to postings at the end
+        delta: Dict[int, Tuple[Set[int], Set[int]]] = {}
+        added = updated = 0
+
+        for (rel_path, version), packed in zip(changed, extracted):
+            if packed is None:
+                continue
+            file_id = self._ids.get(rel_path)
+            if file_id is not None:
+                for trigram in self._stored_trigrams(file_id):
+                    delta.setdefault(trigram, (set(), set()))[1].add(file_id)
+                updated += 1
+            else:
+                file_id = self._next_id
+                self._next_id += 1
+                self._files[file_id] = rel_path
+                self._ids[rel_path] = file_id
+                added += 1
+            self._versions[file_id] = version
+            for trigram in array("i", packed):
+                delta.setdefault(trigram, (set(), set()))[0].add(file_id)
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (id, path, mtime_ns, size, trigrams) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (file_id, rel_path, version[0], version[1], packed)
+            )
+
+        removed = [self._ids[p] for p in self._ids.keys() - seen]
+        for file_id in removed:
+            for trigram in self._stored_trigrams(file_id):
+                delta.setdefault(trigram, (set(), set()))[1].add(file_id)
+            del self._ids[self._files.pop(file_id)]
+            del self._versions[file_id]
+            self._db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+        for trigram, (adds, removes) in delta.items():
+            # An updated file is in both sets when it kept a trigram
+            files = (self._posting(trigram) - (removes - adds)) | adds
+            self._posting_cache.pop(trigram, None)
+            if files:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO postings (trigram, count, files) VALUES (?, ?, ?)",
+                    (trigram, len(files), array("i", sorted(files)).tobytes())
+                )
+            else:
+                self._db.execute("DELETE FROM postings WHERE trigram = ?", (trigram,))
+        self._db.commit()
+
+        self.refreshed_at = time.monotonic()
+        self.last_refresh = {
+            "added": added,
+            "updated": updated,
+            "removed": len(removed),
+            "seconds": time.perf_counter() - started
+        }
+
+    def refresh_in_background(self) -> bool:
+        """Start a refresh on a daemon thread unless one is already running"""
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return False
+            self._refresh_thread = threading.Thread(target=self.refresh, daemon=True,
+                                                    name="project-index-refresh")
+            self._refresh_thread.start()
+            return True
+
+    @property
+    def refreshing(self) -> bool:
+        thread = self._refresh_thread
+        return thread is not None and thread.is_alive()
+
+    def candidates(self, query: str) -> List[str]:
+        """Files that contain every trigram of query (a superset of the real matches)"""
+        with self._lock:
+            trigrams = query_trigrams(query)
+            if not trigrams:
+                # Queries shorter than 3 bytes can't be narrowed down
+                return sorted(self._files.values())
+            placeholders = ",".join("?" * len(trigrams))
+            rows = self._db.execute(
+                f"SELECT trigram, count FROM postings WHERE trigram IN ({placeholders})",
+                tuple(trigrams)
+            ).fetchall()
+            if len(rows) < len(trigrams):
+                # Some trigram occurs nowhere
+                return []
+            # Rarest trigrams first: the candidate set shrinks fastest that way
+            files = None
+            for trigram, _ in sorted(rows, key=lambda row: row[1]):
+                posting = self._posting(trigram)
+                files = set(posting) if files is None else files & posting
+                if len(files) <= ENOUGH_CANDIDATES:
+                    break
+            return sorted(self._files[file_id] for file_id in files)
+
+    def find(self, query: str, ignore_case: bool = False, word: bool = False,
+             max_results: int = 50) -> Dict:
+        """Lines containing query (literally), plus files whose path contains it"""
+        started = time.perf_counter()
+        if not self.refreshed_at:
+            # First query in this process: the stored index may be arbitrarily old
+            self.refresh()
+        elif time.monotonic() - self.refreshed_at > self.max_age_seconds:
+            self.refresh_in_background()
+        index_age = time.monotonic() - self.refreshed_at
+        candidates = self.candidates(query)
+
+        pattern = re.escape(query.encode("utf-8"))
+        if word:
+            pattern = rb"\b" + pattern + rb"\b"
+        regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        matches = []
+        for rel_path in candidates:
+            if len(matches) >= max_results:
+                break
+            try:
+                matches.extend(search_file(os.path.join(self.root, rel_path), regex,
+                                           max_matches=max_results - len(matches),
+                                           display_path=rel_path))
+            except OSError:
+                continue
+
+        needle = query.lower()
+        with self._lock:
+            paths = sorted(p for p in self._files.values() if needle in p.lower())
+        return {
+            "matches": matches,
+            "paths": paths[:max_results],
+            "candidate_files": len(candidates),
+            "index_age_seconds": round(index_age, 3),
+            "refreshing": self.refreshing,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            index_bytes = 0
+            if self.path:
+                for suffix in ("", "-wal"):
+                    if os.path.exists(self.path + suffix):
+                        index_bytes += os.path.getsize(self.path + suffix)
+            return {
+                "files": len(self._files),
+                "trigrams": self._db.execute("SELECT COUNT(*) FROM postings").fetchone()[0],
+                "index_bytes": index_bytes,
+                "load_seconds": self.load_seconds,
+                "last_refresh": self.last_refresh
+            }
+
+    def close(self):
+        thread = self._refresh_thread
+        if thread is not None:
+            thread.join()
+        self._db.close()
+
+
+_project_indexes: Dict[str, ProjectIndex] = {}
+
+
+def find_in_project(query: str, ignore_case: bool = False, word: bool = False,
+                    max_results: int = 50) -> Dict:
+    """Tool entry point: one shared, persistent index per working directory"""
+    root = os.getcwd()
+    index = _project_indexes.get(root)
+    if index is None:
+        index = _project_indexes[root] = ProjectIndex(".", path=".project_index.sqlite")
+    return index.find(query, ignore_case, word, max_results)
@@ -2,7 +2,7 @@
 #Refactoring Our README Agent: Using Tool Decorators
 
 # First, we'll define our tools using decorators
-@register_tool(tags=["file_operations", "read"])
+@register_tool(tags=["file_operations", "read"], cacheable=Cacheable(file_args=("name",)))
 def read_project_file(name: str) -> str:
     """Reads and returns the content of a specified project file.
 
@@ -18,7 +18,7 @@ def read_project_file(name: str) -> str:
     with open(name, "r") as f:
         return f.read()
 
-@register_tool(tags=["file_operations", "list"])
+@register_tool(tags=["file_operations", "list"], cacheable=Cacheable(directories=(".",)))
 def list_project_files() -> List[str]:
     """Lists all Python files in the current project directory.
 
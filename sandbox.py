@@ -0,0 +1,206 @@
+#Running Generated Tests in a Sandbox
+"""Generated code can't be trusted to be correct, or even to run. SandboxPool runs a
+file of generated code plus its unittest tests in a separate Python process:
+
+Each run gets a fresh interpreter (-I isolated mode) in its own temporary directory,
+with CPU time, memory and file size limits where the platform supports them
+A run that goes past its timeout is killed
+Processes are started ahead of time and wait for their job, so a run doesn't pay
+for interpreter startup; each process runs one job and is then replaced
+
+Usage:
+
+with SandboxPool(size=4) as sandbox:
+    result = sandbox.run(function_code + "\n\n" + test_code)
+    print(result["passed"], result["output"])"""
+
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+WORKER_SOURCE = r'''
+import ast, importlib.util, io, json, os, sys, types, unittest
+try:
+    import resource
+except ImportError:
+    resource = None
+
+job = json.loads(sys.stdin.readline())
+if resource is not None:
+    for limit, value in ((resource.RLIMIT_CPU, job["cpu_seconds"]),
+                         (resource.RLIMIT_AS, job["memory_bytes"]),
+                         (resource.RLIMIT_FSIZE, job["file_bytes"])):
+        try:
+            resource.setrlimit(limit, (value, value))
+        except (ValueError, OSError):
+            pass
+
+# Generated tests often import the function from a module that doesn't exist
+# ("from factorial import factorial"); the function is in this same file.
+def missing(name):
+    if not name:
+        return True  # relative import; the candidate is not in a package
+    try:
+        return importlib.util.find_spec(name.split(".")[0]) is None
+    except (ImportError, ValueError):
+        return True
+
+class DropMissingImports(ast.NodeTransformer):
+    """Remove imports of modules that aren't installed, however they are written
+    (parenthesized or spread over several lines)"""
+    def visit_Import(self, node):
+        node.names = [alias for alias in node.names if not missing(alias.name)]
+        return node if node.names else ast.copy_location(ast.Pass(), node)
+
+    def visit_ImportFrom(self, node):
+        if node.level or missing(node.module):
+            return ast.copy_location(ast.Pass(), node)
+        return node
+
+stream = io.StringIO()
+result = {"passed": False, "tests_run": 0, "failures": 0, "errors": 0}
+try:
+    module = types.ModuleType("candidate")
+    module.__file__ = os.path.abspath("candidate.py")
+    sys.modules["candidate"] = module
+    tree = ast.fix_missing_locations(DropMissingImports().visit(ast.parse(job["code"], "candidate.py")))
+    exec(compile(tree, "candidate.py", "exec"), module.__dict__)
+    suite = unittest.defaultTestLoader.loadTestsFromModule(module)
+    outcome = unittest.TextTestRunner(stream=stream, verbosity=2).run(suite)
+    result.update(passed=outcome.wasSuccessful() and outcome.testsRun > 0,
+                  tests_run=outcome.testsRun,
+                  failures=len(outcome.failures),
+                  errors=len(outcome.errors))
+    if outcome.testsRun == 0:
+        stream.write("No tests were found.\n")
+except BaseException:
+    import traceback
+    stream.write(traceback.format_exc())
+    result["errors"] = 1
+result["output"] = stream.getvalue()[-job["max_output"]:]
+sys.__stdout__.write("\n" + json.dumps(result) + "\n")
+sys.__stdout__.flush()
+'''
+
+
+class _Sandbox:
+    """One started interpreter waiting for its job on stdin"""
+
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix="sandbox-")
+        self.process = subprocess.Popen(
+            [sys.executable, "-I", "-c", WORKER_SOURCE],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            cwd=self.directory, text=True,
+            env={"PATH": os.environ.get("PATH", ""), "PYTHONHASHSEED": "0"}
+        )
+
+    def discard(self):
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class SandboxPool:
+    def __init__(self,
+                 size: int = 4,
+                 timeout: float = 30.0,
+                 memory_bytes: int = 512 * 1024 * 1024,
+                 file_bytes: int = 16 * 1024 * 1024,
+                 max_output: int = 4000):
+        """
+        size: processes kept started and waiting
+        timeout: wall-clock seconds before a run is killed (also the CPU limit)
+        max_output: characters of test output kept (the end of it)
+        """
+        self.size = size
+        self.timeout = timeout
+        self.memory_bytes = memory_bytes
+        self.file_bytes = file_bytes
+        self.max_output = max_output
+        self._ready = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()  # orders _replenish against close; guards the counters
+        self.runs = 0
+        self.timeouts = 0
+        for _ in range(size):
+            self._ready.put(_Sandbox())
+
+    def _replenish(self):
+        sandbox = _Sandbox()
+        with self._lock:
+            # close() sets _closed under the same lock before draining the queue, so
+            # a sandbox is either drained by close() or discarded here
+            if not self._closed:
+                self._ready.put(sandbox)
+                return
+        sandbox.discard()
+
+    def run(self, code: str, timeout: Optional[float] = None) -> Dict:
+        """Run code (a function plus unittest tests) in a fresh process.
+        Returns passed, tests_run, failures, errors, output, seconds and timed_out."""
+        if self._closed:
+            raise RuntimeError("SandboxPool is closed")
+        timeout = timeout or self.timeout
+        try:
+            sandbox = self._ready.get_nowait()
+        except queue.Empty:
+            sandbox = _Sandbox()
+        # Start the replacement while this one runs
+        threading.Thread(target=self._replenish, daemon=True).start()
+
+        job = {
+            "code": code,
+            "cpu_seconds": max(1, int(timeout)),
+            "memory_bytes": self.memory_bytes,
+            "file_bytes": self.file_bytes,
+            "max_output": self.max_output
+        }
+        started = time.perf_counter()
+        with self._lock:
+            self.runs += 1
+        try:
+            stdout, _ = sandbox.process.communicate(json.dumps(job) + "\n", timeout=timeout)
+        except subprocess.TimeoutExpired:
+            with self._lock:
+                self.timeouts += 1
+            return {"passed": False, "tests_run": 0, "failures": 0, "errors": 1,
+                    "output": f"Tests timed out after {timeout}s", "timed_out": True,
+                    "seconds": time.perf_counter() - started}
+        finally:
+            sandbox.discard()
+
+        seconds = time.perf_counter() - started
+        last_line = stdout.rstrip().rsplit("\n", 1)[-1] if stdout.strip() else ""
+        try:
+            result = json.loads(last_line)
+        except ValueError:
+            # The process died before reporting (e.g. it hit a resource limit)
+            result = {"passed": False, "tests_run": 0, "failures": 0, "errors": 1,
+                      "output": stdout[-self.max_output:] or f"Exited with code {sandbox.process.returncode}"}
+        result["timed_out"] = False
+        result["seconds"] = seconds
+        return result
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._ready.get_nowait().discard()
+            except queue.Empty:
+                return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
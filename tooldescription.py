@@ -25,38 +25,326 @@ Analyzes type hints and parameters to build the schema
 Registers the tool in a central registry"""
 
 #Implementing the Decorator
+"""Introspection (inspect.signature, get_type_hints, schema building) only happens
+the first time a tool's metadata is read, not at import time. With a schema cache
+file configured (TOOL_SCHEMA_CACHE), even that first read is skipped for tools
+whose file hasn't changed."""
+
+import atexit
+import hashlib
+import inspect
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections.abc import Mapping
+from typing import Union
+
+# Part of every schema cache key. Bump it whenever get_tool_metadata's output changes
+# shape, so entries written by the older code are ignored rather than served.
+# 2: generated schemas declare additionalProperties
+SCHEMA_VERSION = 2
+
+_ADDRESS = re.compile(r" at 0x[0-9a-fA-F]+")
+
+
+def _stable_repr(value) -> str:
+    """repr that is the same in every run: sets and dicts are sorted, classes are
+    named by module and qualname, and memory addresses are dropped"""
+    if isinstance(value, (set, frozenset)):
+        return "{" + ", ".join(sorted(_stable_repr(v) for v in value)) + "}"
+    if isinstance(value, dict):
+        return "{" + ", ".join(sorted(f"{_stable_repr(k)}: {_stable_repr(v)}"
+                                      for k, v in value.items())) + "}"
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__ + "(" + ", ".join(_stable_repr(v) for v in value) + ")"
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    if hasattr(value, "co_code"):
+        return _code_fingerprint(value)
+    return _ADDRESS.sub("", repr(value))
+
+
+def _code_fingerprint(code) -> str:
+    """Stand-in for a function's source when it isn't available"""
+    return _stable_repr((code.co_code.hex(), code.co_consts, code.co_names, code.co_varnames))
+
+
+_file_fingerprints = {}
+
+
+def _file_fingerprint(filename: str) -> str:
+    """mtime and size of the file a function was defined in, looked up once per process.
+    Any edit to the file changes it, which is cheaper than hashing the function's source."""
+    fingerprint = _file_fingerprints.get(filename)
+    if fingerprint is None:
+        try:
+            stat = os.stat(filename)
+            fingerprint = f"{stat.st_mtime_ns}:{stat.st_size}"
+        except OSError:
+            fingerprint = ""
+        _file_fingerprints[filename] = fingerprint
+    return fingerprint
+
+
+def _annotation_files(annotations) -> list:
+    """Files defining the annotations' types (and their type arguments), so a changed
+    class in another module changes the key too"""
+    files = set()
+    pending = list(annotations.values())
+    while pending:
+        value = pending.pop()
+        module = sys.modules.get(getattr(value, "__module__", None) or "")
+        filename = getattr(module, "__file__", None)
+        if filename:
+            files.add(filename)
+        pending.extend(getattr(value, "__args__", None) or ())
+    return sorted(files)
+
+
+def _function_fingerprint(func) -> str:
+    """Identifies the function's definition without inspect: its file's fingerprint
+    and position, or its bytecode when it wasn't loaded from a file, plus the
+    fingerprints of the files its annotations come from"""
+    code = getattr(func, "__code__", None)
+    if code is None:
+        return _stable_repr(func)
+    file_fingerprint = _file_fingerprint(code.co_filename)
+    if file_fingerprint:
+        parts = [f"{code.co_filename}:{code.co_firstlineno}:{file_fingerprint}"]
+    else:
+        parts = [_code_fingerprint(code), _stable_repr(getattr(func, "__defaults__", None))]
+    for filename in _annotation_files(getattr(func, "__annotations__", None) or {}):
+        if filename != code.co_filename:
+            parts.append(f"{filename}:{_file_fingerprint(filename)}")
+    return "\n".join(parts)
+
+
+class ToolSchemaCache:
+    """On-disk cache of computed descriptions and parameter schemas, keyed by a
+    hash of where each function is defined (file, line, and the file's mtime and
+    size), the files its annotation types come from, and its docstring. Building the key never calls
+    inspect, so a hit is much cheaper than computing the metadata."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path:
+            atexit.register(self.save)
+
+    @staticmethod
+    def make_key(func, tool_name, description):
+        payload = "\n".join([
+            str(SCHEMA_VERSION), func.__module__, func.__qualname__,
+            str(tool_name), str(description), _function_fingerprint(func), str(func.__doc__)
+        ])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, "r") as f:
+                        self._entries = json.load(f)
+                except (OSError, ValueError):
+                    self._entries = {}
+        return self._entries
+
+    def get(self, key):
+        if not self.path:
+            return None
+        with self._lock:
+            return self._load().get(key)
+
+    def put(self, key, value):
+        if not self.path:
+            return
+        with self._lock:
+            self._load()[key] = value
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+schema_cache = ToolSchemaCache(os.environ.get("TOOL_SCHEMA_CACHE"))
+
+# Bumped on every registration so memoized registries know when to rebuild
+tools_version = 0
+
+# module name -> {"tools", "register_seconds", "metadata_seconds"}
+registration_stats = {}
+
+
+def _record_time(module, field, seconds, new_tool=False):
+    stats = registration_stats.setdefault(
+        module, {"tools": 0, "register_seconds": 0.0, "metadata_seconds": 0.0})
+    stats[field] += seconds
+    if new_tool:
+        stats["tools"] += 1
+
+
+class LazyToolMetadata(Mapping):
+    """The tools[...] entry for one tool. It reads like the old metadata dict,
+    but description and parameters are only computed on first access."""
+
+    def __init__(self, func, tool_name, description, parameters_override,
+                 terminal, tags, timeout, executor, cacheable):
+        self._func = func
+        self._tool_name = tool_name
+        self._description = description
+        self._parameters_override = parameters_override
+        self._resolved = None
+        self._lock = threading.Lock()
+        self._static = {
+            "function": func,
+            "terminal": terminal,
+            "tags": tags or [],
+            "timeout": timeout,
+            "executor": executor,
+            "cacheable": cacheable
+        }
+
+    def _resolve(self):
+        with self._lock:
+            if self._resolved is not None:
+                return self._resolved
+            started = time.perf_counter()
+            key = None
+            cached = None
+            if self._parameters_override is None:
+                key = ToolSchemaCache.make_key(self._func, self._tool_name, self._description)
+                cached = schema_cache.get(key)
+            if cached is None:
+                metadata = get_tool_metadata(
+                    func=self._func,
+                    tool_name=self._tool_name,
+                    description=self._description,
+                    parameters_override=self._parameters_override,
+                    terminal=self._static["terminal"],
+                    tags=self._static["tags"]
+                )
+                cached = {"description": metadata["description"],
+                          "parameters": metadata["parameters"]}
+                if key is not None:
+                    schema_cache.put(key, cached)
+            self._resolved = dict(self._static, **cached)
+            _record_time(self._func.__module__, "metadata_seconds",
+                         time.perf_counter() - started)
+            return self._resolved
+
+    def __getitem__(self, key):
+        if key in self._static:
+            return self._static[key]
+        return self._resolve()[key]
+
+    def __iter__(self):
+        return iter(self._resolve())
+
+    def __len__(self):
+        return len(self._resolve())
+
+    def __repr__(self):
+        return f"LazyToolMetadata({self._tool_name!r})"
+
+
 def register_tool(tool_name=None, description=None, 
-                 parameters_override=None, terminal=False, tags=None):
-    """Registers a function as an agent tool."""
+                 parameters_override=None, terminal=False, tags=None,
+                 timeout=None, executor="inline", cacheable=None):
+    """Registers a function as an agent tool.
+
+    timeout, executor and cacheable are passed on to the Action (see Action for the options).
+    """
     def decorator(func):
-        # Extract all metadata from the function
-        metadata = get_tool_metadata(
+        started = time.perf_counter()
+        name = tool_name or func.__name__
+
+        # Re-registering a tool replaces it, including its old tags
+        if name in tools:
+            for tag in tools[name]["tags"]:
+                tools_by_tag.get(tag, set()).discard(name)
+
+        # Register in our global tools dictionary; metadata is extracted on first use
+        tools[name] = LazyToolMetadata(
             func=func,
-            tool_name=tool_name,
+            tool_name=name,
             description=description,
             parameters_override=parameters_override,
             terminal=terminal,
-            tags=tags
+            tags=tags,
+            timeout=timeout,
+            executor=executor,
+            cacheable=cacheable
         )
         
-        # Register in our global tools dictionary
-        tools[metadata["tool_name"]] = {
-            "description": metadata["description"],
-            "parameters": metadata["parameters"],
-            "function": metadata["function"],
-            "terminal": metadata["terminal"],
-            "tags": metadata["tags"]
-        }
-        
-        # Also maintain a tag-based index
-        for tag in metadata["tags"]:
-            if tag not in tools_by_tag:
-                tools_by_tag[tag] = []
-            tools_by_tag[tag].append(metadata["tool_name"])
-        
+        # Also maintain a tag-based index (sets, so a tool is never listed twice)
+        for tag in tags or []:
+            tools_by_tag.setdefault(tag, set()).add(name)
+
+        global tools_version
+        tools_version += 1
+
+        _record_time(func.__module__, "register_seconds",
+                     time.perf_counter() - started, new_tool=True)
         return func
     return decorator
 
+
+def registration_report():
+    """Print how long tool registration and metadata extraction took per module"""
+    rows = sorted(registration_stats.items(),
+                  key=lambda item: item[1]["register_seconds"] + item[1]["metadata_seconds"],
+                  reverse=True)
+    print(f"{'module':<40} {'tools':>6} {'register ms':>12} {'metadata ms':>12}")
+    for module, stats in rows:
+        print(f"{module:<40} {stats['tools']:>6} "
+              f"{stats['register_seconds'] * 1000:>12.2f} {stats['metadata_seconds'] * 1000:>12.2f}")
+    return registration_stats
+
+def get_json_type(param_type) -> str:
+    """Map a Python type to its JSON schema type name"""
+    origin = getattr(param_type, "__origin__", None) or param_type
+    if origin is bool:
+        return "boolean"
+    if origin is int:
+        return "integer"
+    if origin is float:
+        return "number"
+    if origin in (list, tuple, set, frozenset):
+        return "array"
+    if origin is dict:
+        return "object"
+    return "string"
+
+
+def get_json_schema(param_type) -> dict:
+    """JSON schema for a type hint, including List[...] items and Optional[...]"""
+    args = [arg for arg in getattr(param_type, "__args__", ()) if arg is not type(None)]
+    if getattr(param_type, "__origin__", None) is Union:
+        if len(args) == 1:
+            schema = get_json_schema(args[0])
+            schema["type"] = [schema["type"], "null"]
+            return schema
+        return {"type": "string"}
+
+    schema = {"type": get_json_type(param_type)}
+    if schema["type"] == "array" and args:
+        schema["items"] = get_json_schema(args[0])
+    return schema
+
+
 def get_tool_metadata(func, tool_name=None, description=None, 
                      parameters_override=None, terminal=False, tags=None):
     """Extracts metadata for a function to use in tool registration."""
@@ -88,15 +376,17 @@ def get_tool_metadata(func, tool_name=None, description=None,
 
             # Convert Python types to JSON schema types
             param_type = type_hints.get(param_name, str)
-            param_schema = {
-                "type": get_json_type(param_type)
-            }
+            param_schema = get_json_schema(param_type)
             
             args_schema["properties"][param_name] = param_schema
             
             # If parameter has no default, it's required
             if param.default == inspect.Parameter.empty:
                 args_schema["required"].append(param_name)
+
+        # Extra arguments would only fail inside the call unless it takes **kwargs
+        args_schema["additionalProperties"] = any(
+            param.kind == inspect.Parameter.VAR_KEYWORD for param in signature.parameters.values())
     else:
         args_schema = parameters_override
     
@@ -109,6 +399,139 @@ def get_tool_metadata(func, tool_name=None, description=None,
         "tags": tags or []
     }
 
+#Querying Tools by Tag
+"""Tags can be combined with & (and), | (or) and ~ (not), e.g.
+"file_operations & read & ~write". A query is evaluated with set operations on
+tools_by_tag."""
+
+import re
+from types import MappingProxyType
+
+_TAG_TOKEN = re.compile(r"\s*(?:([&|~()])|([A-Za-z0-9_.\-]+))")
+
+
+def parse_tag_query(query: str):
+    """Parse a tag query into a nested tuple: ("tag", name), ("not", q),
+    ("and", q1, q2) or ("or", q1, q2). ~ binds tightest, then &, then |."""
+    tokens = []
+    pos = 0
+    query = query.strip()
+    while pos < len(query):
+        match = _TAG_TOKEN.match(query, pos)
+        if not match:
+            raise ValueError(f"Invalid tag query at {pos}: {query!r}")
+        tokens.append(match.group(1) or ("tag", match.group(2)))
+        pos = match.end()
+
+    def parse_or(i):
+        left, i = parse_and(i)
+        while i < len(tokens) and tokens[i] == "|":
+            right, i = parse_and(i + 1)
+            left = ("or", left, right)
+        return left, i
+
+    def parse_and(i):
+        left, i = parse_not(i)
+        while i < len(tokens) and tokens[i] == "&":
+            right, i = parse_not(i + 1)
+            left = ("and", left, right)
+        return left, i
+
+    def parse_not(i):
+        if i < len(tokens) and tokens[i] == "~":
+            operand, i = parse_not(i + 1)
+            return ("not", operand), i
+        if i < len(tokens) and tokens[i] == "(":
+            inner, i = parse_or(i + 1)
+            if i >= len(tokens) or tokens[i] != ")":
+                raise ValueError(f"Missing ')' in tag query: {query!r}")
+            return inner, i + 1
+        if i < len(tokens) and isinstance(tokens[i], tuple):
+            return tokens[i], i + 1
+        raise ValueError(f"Expected a tag in query: {query!r}")
+
+    if not tokens:
+        raise ValueError("Empty tag query")
+    tree, i = parse_or(0)
+    if i != len(tokens):
+        raise ValueError(f"Unexpected {tokens[i]!r} in tag query: {query!r}")
+    return tree
+
+
+def select_tools(query) -> set:
+    """Names of the registered tools matching a tag query (string or parsed tree)"""
+    tree = parse_tag_query(query) if isinstance(query, str) else query
+    kind = tree[0]
+    if kind == "tag":
+        return set(tools_by_tag.get(tree[1], ()))
+    if kind == "not":
+        return set(tools) - select_tools(tree[1])
+    if kind == "and":
+        return select_tools(tree[1]) & select_tools(tree[2])
+    return select_tools(tree[1]) | select_tools(tree[2])
+
+
+class PythonActionRegistry(ActionRegistry):
+    """ActionRegistry built from the tools registered with @register_tool.
+
+    tags: include tools with any of these tags
+    tool_names: only include these tools
+    query: a tag query such as "file_operations & read & ~write"
+
+    Use PythonActionRegistry.shared(...) to get one memoized, read-only instance per
+    query that any number of agents can share.
+    """
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, tags=None, tool_names=None, query=None):
+        super().__init__()
+        self._frozen = False
+        selected = set(tools)
+        if tags:
+            selected &= set().union(*(tools_by_tag.get(tag, set()) for tag in tags))
+        if tool_names:
+            selected &= set(tool_names)
+        if query:
+            selected &= select_tools(query)
+
+        for tool_name in sorted(selected):
+            tool_desc = tools[tool_name]
+            self.register(Action(
+                name=tool_name,
+                function=tool_desc["function"],
+                description=tool_desc["description"],
+                parameters=tool_desc.get("parameters", {}),
+                terminal=tool_desc.get("terminal", False),
+                timeout=tool_desc.get("timeout"),
+                executor=tool_desc.get("executor", "inline"),
+                cacheable=tool_desc.get("cacheable")
+            ))
+
+    @classmethod
+    def shared(cls, query=None, tags=None, tool_names=None) -> "PythonActionRegistry":
+        """Memoized registry for this selection; rebuilt only after new tools register"""
+        key = (repr(parse_tag_query(query)) if query else None,
+               tuple(sorted(tags)) if tags else None,
+               tuple(sorted(tool_names)) if tool_names else None)
+        with cls._shared_lock:
+            version, registry = cls._shared.get(key, (None, None))
+            if version != tools_version:
+                registry = cls(tags=tags, tool_names=tool_names, query=query)
+                registry.freeze()
+                cls._shared[key] = (tools_version, registry)
+            return registry
+
+    def freeze(self):
+        self.actions = MappingProxyType(self.actions)
+        self._frozen = True
+
+    def register(self, action):
+        if getattr(self, "_frozen", False):
+            raise TypeError("This registry is shared between agents and can't be modified")
+        super().register(action)
+
+
 #Consider how this simplifies adding a new parameter:
 @register_tool(tags=["file_operations"])
 def read_file(file_path: str, encoding: str = 'utf-8') -> str:
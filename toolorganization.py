@@ -24,10 +24,10 @@ tools_by_tag: A dictionary of tool names organized by tag"""
 
 """# Internal structure of tools_by_tag
 {
-    "file_operations": ["read_file", "write_file"],
-    "write": ["write_file"],
-    "database": ["query_database"],
-    "read": ["query_database"]
+    "file_operations": {"read_file", "write_file"},
+    "write": {"write_file"},
+    "database": {"query_database"},
+    "read": {"query_database"}
 }"""
 
 """This organization allows us to easily find related tools. For instance, we can
@@ -79,4 +79,35 @@ file_agent = Agent(
     action_registry=ActionRegistry(tags=["file_operations"]),
     generate_response=generate_response,
     environment=Environment()
-)
\ No newline at end of file
+)
+
+#Combining Tags in Queries
+#Tags combine with & (and), | (or) and ~ (not). PythonActionRegistry.shared memoizes one
+#read-only registry per query, so thousands of agents can use it without rebuilding it:
+
+file_reader_agent = Agent(
+    goals=[Goal(1, "File Reader", "Read project files without changing them")],
+    agent_language=AgentFunctionCallingActionLanguage(),
+    action_registry=PythonActionRegistry.shared("file_operations & read & ~write"),
+    generate_response=generate_response,
+    environment=Environment()
+)
+
+
+#Running Many Specialized Agents Together
+#An AgentPool (agent_pool.py) runs many sessions of these agents side by side. They share one
+#limit on in-flight LLM requests, and sessions whose goals have a lower priority number start first.
+#Memories that summarize old steps use the pool's summary_executor, sized to the same limit:
+
+def summarize_files(file_paths: List[str]) -> Dict:
+    pool = AgentPool(max_workers=16, max_llm_in_flight=4)
+    for file_path in file_paths:
+        pool.submit(create_file_processing_agent(), f"Summarize {file_path}",
+                    memory=TokenBudgetMemory(executor=pool.summary_executor))
+    pool.submit(create_database_agent(), "Count the orders placed this week")
+    pool.wait()
+    pool.shutdown()
+    return pool.report()
+
+# report = summarize_files(["README.md", "setup.py", "requirements.txt"])
+# print(report["aggregate"])